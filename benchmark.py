@@ -0,0 +1,305 @@
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from math import exp, lgamma, log
+from statistics import mean, variance
+
+from aalpy.learning_algs import run_Lstar, run_RPNI
+from aalpy.oracles import StatePrefixEqOracle
+
+from compiled_automata import CompiledMealySUL
+from data_classes import load_dot_files
+from data_generation import generate_random_data, data_from_computed_e_set
+from experiment_runner import task_seed
+from flat_rpni import run_flat_rpni
+from learning_setups import l_star_experiment, rpni_experiment
+from model_cache import compact_model
+from model_comparison import create_test_cases, compare_learned_models
+
+stage_names = ['load_dot_files', 'create_test_cases', 'generate_random_data', 'data_from_computed_e_set',
+               'rpni_experiment', 'run_rpni', 'run_flat_rpni', 'l_star_experiment', 'compare_learned_models']
+
+
+def _eq_oracle(model):
+    return StatePrefixEqOracle(model.get_input_alphabet(), CompiledMealySUL(model), walks_per_state=25, walk_len=30)
+
+
+def _stages(benchmark, model_name, model, settings):
+    """
+    Returns a function per stage. The inputs of the stages (test cases, data and a learned model) are prepared here,
+    so that only the stage itself is measured.
+    """
+    random.seed(task_seed(settings['seed'], 'prepare', benchmark, model_name))
+    alphabet = model.get_input_alphabet()
+    num_test_cases, num_sequences = settings['num_test_cases'], settings['num_sequences']
+    max_sequence_len = 2 * model.size
+
+    test_cases = create_test_cases([(model_name, model)], num_test_cases, 'coverage')[model_name]
+    data = generate_random_data(model, num_sequences, 1, max_sequence_len)
+    learned_model = run_Lstar(alphabet, CompiledMealySUL(model), _eq_oracle(model), 'mealy', print_level=0)
+
+    return {
+        'load_dot_files': lambda: load_dot_files(benchmark, models=[model_name]),
+        'create_test_cases': lambda: create_test_cases([(model_name, model)], num_test_cases, 'coverage'),
+        'generate_random_data': lambda: generate_random_data(model, num_sequences, 1, max_sequence_len),
+        'data_from_computed_e_set': lambda: data_from_computed_e_set(model),
+        'rpni_experiment': lambda: rpni_experiment(data, model, test_cases, test_cases),
+        'run_rpni': lambda: run_RPNI(data.data, 'mealy', 'sink_state', print_info=False),
+        'run_flat_rpni': lambda: run_flat_rpni(data.view(), 'sink_state'),
+        'l_star_experiment': lambda: l_star_experiment(model, test_cases, test_cases, alphabet, _eq_oracle(model)),
+        'compare_learned_models': lambda: compare_learned_models(model, learned_model, test_cases),
+    }
+
+
+def _measure(stage, seed, repeats):
+    """
+    Runs the stage repeats times and once more with tracemalloc (which slows down execution, so the memory run is
+    not timed). Every run starts from the same random state.
+    """
+    times = []
+    for _ in range(repeats):
+        random.seed(seed)
+        start = time.perf_counter()
+        stage()
+        times.append(time.perf_counter() - start)
+
+    random.seed(seed)
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'times': times, 'peak_memory': peak_memory}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(benchmarks=('BLE', 'MQTT'), stages=None, repeats=5, seed=0, num_test_cases=1000,
+                   num_sequences=300, models=None, verbose=True):
+    """
+    Measures every stage on every model of the benchmarks, or on the models matching the names or glob patterns in
+    models.
+
+    Returns:
+
+        dict with the settings and environment ('meta') and the measurements per model and stage ('results'), where
+        a measurement consists of the run times in seconds and the peak memory in bytes
+
+    """
+    stages = stages or stage_names
+    settings = {'repeats': repeats, 'seed': seed, 'num_test_cases': num_test_cases, 'num_sequences': num_sequences}
+    results = dict()
+
+    for benchmark in benchmarks:
+        for model_name, model in load_dot_files(benchmark, models):
+            stage_functions = _stages(benchmark, model_name, model, settings)
+            model_results = results[f'{benchmark}/{model_name}'] = dict()
+            for stage_name in stages:
+                model_results[stage_name] = _measure(stage_functions[stage_name],
+                                                     task_seed(seed, stage_name, benchmark, model_name), repeats)
+                if verbose:
+                    print(f'{benchmark}/{model_name} {stage_name}: '
+                          f'{round(mean(model_results[stage_name]["times"]), 4)} s, '
+                          f'{round(model_results[stage_name]["peak_memory"] / 2 ** 20, 2)} MiB')
+
+    meta = {'date': datetime.now().isoformat(timespec='seconds'), 'commit': _git_commit(),
+            'python': sys.version.split()[0], 'platform': platform.platform(), 'benchmarks': list(benchmarks),
+            'stages': list(stages), 'models': models, **settings}
+    return {'meta': meta, 'results': results}
+
+
+def compare_rpni_engines(benchmarks=('BLE', 'MQTT'), seed=0, num_sequences=300, models=None, verbose=True):
+    """
+    Learns random data of every model with aalpy's RPNI and with FlatRPNI and checks that both learn the same model
+    (same states and transitions in the same order).
+
+    Returns:
+
+        list of (model, aalpy time, flat time, same model) tuples, times in seconds
+
+    """
+    results = []
+    for benchmark in benchmarks:
+        for model_name, model in load_dot_files(benchmark, models):
+            random.seed(task_seed(seed, 'rpni engines', benchmark, model_name))
+            data = generate_random_data(model, num_sequences, 1, 2 * model.size)
+
+            start = time.perf_counter()
+            aalpy_model = run_RPNI(data.data, 'mealy', 'sink_state', print_info=False)
+            aalpy_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            flat_model = run_flat_rpni(data.view(), 'sink_state')
+            flat_time = time.perf_counter() - start
+
+            same_model = compact_model(aalpy_model) == compact_model(flat_model)
+            results.append((f'{benchmark}/{model_name}', aalpy_time, flat_time, same_model))
+            if verbose:
+                print(f'{benchmark}/{model_name}: aalpy {round(aalpy_time, 4)} s, flat {round(flat_time, 4)} s '
+                      f'(speedup {round(aalpy_time / flat_time, 1)}), '
+                      f'{"same model" if same_model else "DIFFERENT MODELS"}')
+    return results
+
+
+def _regularized_incomplete_beta(a, b, x):
+    """
+    I_x(a, b), evaluated with the continued fraction of Numerical Recipes (betacf).
+    """
+    if x <= 0:
+        return 0.
+    if x >= 1:
+        return 1.
+    if x > (a + 1) / (a + b + 2):
+        return 1 - _regularized_incomplete_beta(b, a, 1 - x)
+
+    front = exp(lgamma(a + b) - lgamma(a) - lgamma(b) + a * log(x) + b * log(1 - x)) / a
+    tiny = 1e-300
+    c, d = 1., 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    f = d
+    for m in range(1, 200):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            f *= c * d
+        if abs(c * d - 1) < 1e-12:
+            break
+    return front * f
+
+
+def welch_t_test(baseline, current):
+    """
+    One-sided Welch's t-test of the hypothesis that the mean of current is larger than the mean of baseline.
+
+    Returns:
+
+        t statistic and p-value
+
+    """
+    n_1, n_2 = len(baseline), len(current)
+    var_1 = variance(baseline) / n_1 if n_1 > 1 else 0.
+    var_2 = variance(current) / n_2 if n_2 > 1 else 0.
+    difference = mean(current) - mean(baseline)
+    if var_1 + var_2 == 0:
+        return (float('inf') if difference > 0 else 0.), (0. if difference > 0 else 1.)
+
+    t = difference / (var_1 + var_2) ** 0.5
+    # Welch-Satterthwaite degrees of freedom
+    df = (var_1 + var_2) ** 2 / ((var_1 ** 2 / (n_1 - 1) if n_1 > 1 else 0) +
+                                 (var_2 ** 2 / (n_2 - 1) if n_2 > 1 else 0))
+    # survival function of the t distribution
+    p_two_sided = _regularized_incomplete_beta(df / 2, 0.5, df / (df + t * t))
+    p = p_two_sided / 2 if t > 0 else 1 - p_two_sided / 2
+    return t, p
+
+
+def compare_results(baseline, current, alpha=0.01, min_change=0.05, memory_change=0.1):
+    """
+    Compares two benchmark results. A stage regressed in time if it is slower by more than min_change (relative) and
+    Welch's t-test is significant at level alpha; it regressed in memory if its peak memory grew by more than
+    memory_change (relative).
+
+    Returns:
+
+        list of (model, stage, kind, baseline value, current value) regressions
+
+    """
+    regressions = []
+    for model_name, stages in current['results'].items():
+        for stage_name, measurement in stages.items():
+            reference = baseline['results'].get(model_name, dict()).get(stage_name)
+            if reference is None:
+                continue
+
+            baseline_time, current_time = mean(reference['times']), mean(measurement['times'])
+            _, p = welch_t_test(reference['times'], measurement['times'])
+            if current_time > baseline_time * (1 + min_change) and p < alpha:
+                regressions.append((model_name, stage_name, 'time', baseline_time, current_time))
+
+            if measurement['peak_memory'] > reference['peak_memory'] * (1 + memory_change):
+                regressions.append((model_name, stage_name, 'memory', reference['peak_memory'],
+                                    measurement['peak_memory']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the stages of the learning pipeline.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='measure all stages and store the results')
+    run_parser.add_argument('--benchmarks', nargs='+', default=['BLE', 'MQTT'])
+    run_parser.add_argument('--stages', nargs='+', choices=stage_names, default=None)
+    run_parser.add_argument('--repeats', type=int, default=5)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--num-test-cases', type=int, default=1000)
+    run_parser.add_argument('--num-sequences', type=int, default=300)
+    run_parser.add_argument('--models', nargs='+', default=None, help='model names or glob patterns')
+    run_parser.add_argument('--output', default='benchmark_baseline.json')
+
+    compare_parser = subparsers.add_parser('compare', help='compare results against a baseline; without current '
+                                                           'results, the benchmarks of the baseline are run again')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current', nargs='?')
+    compare_parser.add_argument('--alpha', type=float, default=0.01, help='significance level of the t-test')
+    compare_parser.add_argument('--min-change', type=float, default=0.05,
+                                help='relative slowdown below which changes are ignored')
+    compare_parser.add_argument('--memory-change', type=float, default=0.1,
+                                help='relative growth of the peak memory that is reported')
+
+    engines_parser = subparsers.add_parser('engines', help='compare the RPNI engines on random data of every model')
+    engines_parser.add_argument('--benchmarks', nargs='+', default=['BLE', 'MQTT'])
+    engines_parser.add_argument('--seed', type=int, default=0)
+    engines_parser.add_argument('--num-sequences', type=int, default=300)
+    engines_parser.add_argument('--models', nargs='+', default=None, help='model names or glob patterns')
+
+    args = parser.parse_args()
+
+    if args.command == 'engines':
+        results = compare_rpni_engines(args.benchmarks, args.seed, args.num_sequences, args.models)
+        return 0 if all(same_model for *_, same_model in results) else 1
+
+    if args.command == 'run':
+        results = run_benchmarks(args.benchmarks, args.stages, args.repeats, args.seed, args.num_test_cases,
+                                 args.num_sequences, args.models)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current, encoding='utf-8') as f:
+            current = json.load(f)
+    else:
+        meta = baseline['meta']
+        current = run_benchmarks(meta['benchmarks'], meta['stages'], meta['repeats'], meta['seed'],
+                                 meta['num_test_cases'], meta['num_sequences'], meta['models'])
+
+    regressions = compare_results(baseline, current, args.alpha, args.min_change, args.memory_change)
+    for model_name, stage_name, kind, baseline_value, current_value in regressions:
+        unit = 's' if kind == 'time' else 'bytes'
+        print(f'Regression ({kind}) in {stage_name} on {model_name}: {round(baseline_value, 4)} {unit} -> '
+              f'{round(current_value, 4)} {unit}')
+    if not regressions:
+        print('No significant regressions.')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
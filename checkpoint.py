@@ -0,0 +1,34 @@
+import json
+import os
+
+
+class CheckpointFile:
+    """
+    Append-only JSON-lines file. Every record is flushed and fsynced on its own, so an interrupted run loses at most
+    the record that was being written when it stopped.
+    """
+
+    def __init__(self, path) -> None:
+        self.path = path
+
+    def load(self):
+        """
+        Returns all complete records of the checkpoint. A truncated last line (left by an interrupted write) is
+        removed from the file, so that new records can be appended safely.
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        with open(self.path, 'rb+') as f:
+            content = f.read()
+            complete = content.rfind(b'\n') + 1
+            if complete != len(content):
+                f.truncate(complete)
+
+        return [json.loads(line) for line in content[:complete].decode('utf-8').splitlines() if line.strip()]
+
+    def append(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
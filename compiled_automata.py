@@ -0,0 +1,232 @@
+from hashlib import sha256
+from weakref import WeakKeyDictionary
+
+import numpy as np
+from aalpy.base import SUL
+
+
+class SymbolTable:
+    """
+    Interns hashable symbols (inputs or outputs) into dense integer ids.
+    """
+
+    def __init__(self, symbols=()) -> None:
+        self.symbols = []
+        self.index = dict()
+        for symbol in symbols:
+            self.add(symbol)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def add(self, symbol):
+        idx = self.index.get(symbol)
+        if idx is None:
+            idx = len(self.symbols)
+            self.index[symbol] = idx
+            self.symbols.append(symbol)
+        return idx
+
+    def encode(self, sequence):
+        return [self.index[s] for s in sequence]
+
+    def decode(self, ids):
+        return [self.symbols[i] for i in ids]
+
+
+class CompiledMealyMachine:
+    """
+    Integer table representation of a MealyMachine. Row i of `transitions` and `outputs` corresponds to
+    model.states[i], column j to inputs.symbols[j]. Undefined transitions are marked with -1.
+    """
+
+    def __init__(self, model) -> None:
+        self.inputs = SymbolTable(model.get_input_alphabet())
+        self.outputs = SymbolTable()
+        self.states = list(model.states)
+
+        state_index = {id(state): i for i, state in enumerate(self.states)}
+        self.initial_state = state_index[id(model.initial_state)]
+
+        self.transitions = np.full((len(self.states), len(self.inputs)), -1, dtype=np.int32)
+        self.output_fun = np.full((len(self.states), len(self.inputs)), -1, dtype=np.int32)
+        for s, state in enumerate(self.states):
+            for i, target in state.transitions.items():
+                j = self.inputs.index[i]
+                self.transitions[s, j] = state_index[id(target)]
+                self.output_fun[s, j] = self.outputs.add(state.output_fun[i])
+
+    @property
+    def size(self):
+        return len(self.states)
+
+    def aligned_to(self, other):
+        """
+        Returns transition and output tables whose columns follow the input alphabet of `other` and whose output ids
+        refer to the output table of `other`.
+        """
+        return self.aligned_tables(other.inputs, other.outputs)
+
+    def aligned_tables(self, inputs: SymbolTable, outputs: SymbolTable):
+        """
+        Returns transition and output tables whose columns follow `inputs` and whose output ids refer to `outputs`.
+        Outputs unknown to `outputs` get fresh ids, inputs unknown to this machine get undefined (-1) columns.
+        """
+        input_map = np.array([self.inputs.index.get(i, -1) for i in inputs.symbols], dtype=np.int64)
+        defined = input_map >= 0
+
+        output_map = np.array([outputs.index.get(o, len(outputs) + k)
+                               for k, o in enumerate(self.outputs.symbols)] + [-1], dtype=np.int32)
+
+        transitions = np.full((self.size, len(inputs)), -1, dtype=np.int32)
+        output_fun = np.full((self.size, len(inputs)), -1, dtype=np.int32)
+        transitions[:, defined] = self.transitions[:, input_map[defined]]
+        # index -1 selects the trailing -1 entry of output_map, so undefined outputs stay undefined
+        output_fun[:, defined] = output_map[self.output_fun[:, input_map[defined]]]
+        return transitions, output_fun
+
+
+_compiled_models = WeakKeyDictionary()
+
+
+def compile_mealy(model, use_cache=True):
+    """
+    Compiles a MealyMachine into integer tables. Compiled machines are cached per model object, pass use_cache=False
+    if the model was modified after it was compiled.
+    """
+    if use_cache:
+        compiled = _compiled_models.get(model)
+        if compiled is not None:
+            return compiled
+    compiled = CompiledMealyMachine(model)
+    _compiled_models[model] = compiled
+    return compiled
+
+
+class CompiledMealySUL(SUL):
+    """
+    Drop-in replacement for MealySUL that executes the compiled integer tables of the model. Inputs are mapped to
+    their ids when they enter the SUL and outputs are looked up in a table of the original output objects, so no
+    MealyState is touched while querying. Query and step counts are the same as the ones of MealySUL.
+    """
+
+    def __init__(self, mm):
+        super().__init__()
+        self.mm = mm
+        compiled = compile_mealy(mm)
+        num_inputs = len(compiled.inputs)
+        self.input_index = compiled.inputs.index
+        self.initial_offset = compiled.initial_state * num_inputs
+        # flat tables indexed by state * num_inputs + input id; transitions store the offset of the target row,
+        # undefined transitions are None
+        self.transitions = [target * num_inputs if target >= 0 else None
+                            for target in compiled.transitions.ravel().tolist()]
+        self.outputs = [compiled.outputs.symbols[o] if o >= 0 else None
+                        for o in compiled.output_fun.ravel().tolist()]
+        self.current_offset = self.initial_offset
+
+    def pre(self):
+        self.current_offset = self.initial_offset
+
+    def post(self):
+        pass
+
+    def step(self, letter):
+        k = self.current_offset + self.input_index[letter]
+        target = self.transitions[k]
+        if target is None:
+            raise KeyError(letter)
+        self.current_offset = target
+        return self.outputs[k]
+
+    def query(self, word):
+        if len(word) == 0:
+            return super().query(word)
+
+        # same as SUL.query, with pre, step and post inlined
+        transitions, outputs, input_index = self.transitions, self.outputs, self.input_index
+        offset = self.initial_offset
+        out = []
+        for letter in word:
+            k = offset + input_index[letter]
+            offset = transitions[k]
+            if offset is None:
+                raise KeyError(letter)
+            out.append(outputs[k])
+        self.current_offset = offset
+
+        self.num_queries += 1
+        self.num_steps += len(word)
+        return out
+
+
+def model_fingerprint(model):
+    """
+    Hash of the transition structure of a Mealy machine. States are identified by their position in model.states
+    and transitions are hashed in their stored order, so the fingerprint also captures the iteration order that
+    random test case and data generation depend on.
+    """
+    state_index = {id(state): i for i, state in enumerate(model.states)}
+    structure = [state_index[id(model.initial_state)]]
+    for state in model.states:
+        structure.append([(i, state.output_fun[i], state_index[id(target)]) for i, target in state.transitions.items()])
+    return sha256(repr(structure).encode('utf-8')).hexdigest()
+
+
+class EncodedTestSuite:
+    """
+    Test suite stored as one flat array of integer-encoded inputs and an offset array, where test case k is
+    symbols[offsets[k]:offsets[k + 1]]. Iterating yields the decoded test cases.
+    """
+
+    def __init__(self, symbols, offsets, alphabet: SymbolTable) -> None:
+        self.symbols = symbols
+        self.offsets = offsets
+        self.alphabet = alphabet
+
+    @staticmethod
+    def from_sequences(test_cases, alphabet: SymbolTable = None):
+        alphabet = alphabet if alphabet is not None else SymbolTable()
+        flat, offsets = [], [0]
+        for test_case in test_cases:
+            flat.extend(alphabet.add(i) for i in test_case)
+            offsets.append(len(flat))
+        return EncodedTestSuite(np.array(flat, dtype=np.int32), np.array(offsets, dtype=np.int64), alphabet)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, k):
+        return tuple(self.alphabet.decode(self.symbols[self.offsets[k]:self.offsets[k + 1]].tolist()))
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def subset(self, indices):
+        """
+        Returns a suite of the test cases with the given indices, in the given order.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        starts, lengths = self.offsets[indices], self.lengths()[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return EncodedTestSuite(np.asarray(self.symbols)[positions], offsets, self.alphabet)
+
+    def padded(self, symbol_map=None):
+        """
+        Returns the test cases as a (num_test_cases, max_len) matrix padded with 0 together with their lengths.
+        If given, symbol_map translates the suite's symbol ids (e.g. into the input ids of a compiled machine).
+        """
+        lengths = self.lengths()
+        max_len = int(lengths.max()) if len(lengths) else 0
+        symbols = np.asarray(self.symbols)
+        if symbol_map is not None:
+            symbols = symbol_map[symbols]
+        batch = np.zeros((len(lengths), max_len), dtype=np.int32)
+        batch[np.arange(max_len) < lengths[:, None]] = symbols
+        return batch, lengths
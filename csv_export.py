@@ -2,12 +2,21 @@ import csv
 
 from collections import defaultdict
 
+from instrumentation import phase_columns, l_star_phases, rpni_phases, cached_l_star_phases
+
 class Entry:
     def __init__(self):
         pass
 
+    def set_phase_metrics(self, phase_metric_stats):
+        # metrics of instrumented experiments, see instrumentation.phase_columns
+        for attr, value in (phase_metric_stats or dict()).items():
+            setattr(self, attr, value)
+
 class LStarExportEntry(Entry):
-        def __init__(self, model_size, output_queries, steps_output_queries, eq_oracle_queries, steps_eq_oracle, conformance_coverage, learning_rounds, sum_queries, sum_steps, average_trace_len) -> None:
+        def __init__(self, model_size, output_queries, steps_output_queries, eq_oracle_queries, steps_eq_oracle, conformance_coverage, learning_rounds, sum_queries, sum_steps, average_trace_len, correctly_learned_model,
+                     projected_time, measured_time, conformance_random, conformance_random_bound, random_test_cases_used,
+                     phase_metric_stats=None) -> None:
             self.model_size = model_size
             self.output_queries = output_queries
             self.steps_output_queries = steps_output_queries
@@ -18,10 +27,17 @@ class LStarExportEntry(Entry):
             self.sum_queries = sum_queries
             self.sum_steps = sum_steps
             self.average_trace_len = average_trace_len
+            self.correctly_learned_model = correctly_learned_model
+            self.projected_time = projected_time
+            self.measured_time = measured_time
+            self.conformance_random = conformance_random
+            self.conformance_random_bound = conformance_random_bound
+            self.random_test_cases_used = random_test_cases_used
+            self.set_phase_metrics(phase_metric_stats)
         
         @staticmethod
-        def pretty_printed_attr():
-            return {
+        def pretty_printed_attr(instrumented=False):
+            attributes = {
                 "States" : "model_size",
                 "Output queries" : "output_queries",
                 "Steps output queries" : "steps_output_queries",
@@ -31,48 +47,93 @@ class LStarExportEntry(Entry):
                 "Learning rounds": "learning_rounds",
                 "Sum queries" : "sum_queries",
                 "Sum steps" : "sum_steps",
-                "Average trace length": "average_trace_len"
+                "Average trace length": "average_trace_len",
+                "Correctly learned model" : "correctly_learned_model",
+                "Projected time (s)" : "projected_time",
+                "Measured time (s)" : "measured_time",
+                "Conformance (random) %" : "conformance_random",
+                "Conformance (random) bound (pp)" : "conformance_random_bound",
+                "Random test cases" : "random_test_cases_used"
             }
+            if instrumented:
+                attributes.update(phase_columns(l_star_phases))
+            return attributes
 
 class RPNIExportEntry(Entry):
 
-        def __init__(self, model_size, conformance_coverage, conformance_random, data_size, average_len, correctly_learned_model) -> None:
+        def __init__(self, model_size, conformance_coverage, conformance_random, data_size, average_len, correctly_learned_model,
+                     projected_time, measured_time, conformance_random_bound, random_test_cases_used,
+                     phase_metric_stats=None) -> None:
             self.model_size = model_size
             self.conformance_coverage = conformance_coverage
             self.conformance_random = conformance_random
             self.data_size = data_size
             self.average_len = average_len
             self.correctly_learned_model = correctly_learned_model
+            self.projected_time = projected_time
+            self.measured_time = measured_time
+            self.conformance_random_bound = conformance_random_bound
+            self.random_test_cases_used = random_test_cases_used
+            self.set_phase_metrics(phase_metric_stats)
         
         @staticmethod
-        def pretty_printed_attr():
-            return {
+        def pretty_printed_attr(instrumented=False):
+            attributes = {
                 "States" : "model_size",
                 "Conformance (coverage) %" : "conformance_coverage",
                 "Conformance (random) %" : "conformance_random",
                 "Data size" : "data_size",
                 "Average trace length": "average_len",
-                "Correctly learned model" : "correctly_learned_model"
+                "Correctly learned model" : "correctly_learned_model",
+                "Data collection projected time (s)" : "projected_time",
+                "Data collection measured time (s)" : "measured_time",
+                "Conformance (random) bound (pp)" : "conformance_random_bound",
+                "Random test cases" : "random_test_cases_used"
             }
+            if instrumented:
+                attributes.update(phase_columns(rpni_phases))
+            return attributes
 
 class CachedLStarExportEntry(Entry):
 
-        def __init__(self, conformance_coverage, random_sample_size, performed_queries, cache_hits, learning_rounds) -> None:
+        def __init__(self, conformance_coverage, random_sample_size, performed_queries, cache_hits, learning_rounds, correctly_learned_model,
+                     cache_nodes, cache_memory_kib, membership_hit_ratio, equivalence_hit_ratio, longest_cached_prefix,
+                     projected_time, measured_time, phase_metric_stats=None) -> None:
             self.conformance_coverage = conformance_coverage
             self.random_sample_size = random_sample_size
             self.performed_queries = performed_queries
             self.cache_hits = cache_hits
             self.learning_rounds = learning_rounds
+            self.correctly_learned_model = correctly_learned_model
+            self.cache_nodes = cache_nodes
+            self.cache_memory_kib = cache_memory_kib
+            self.membership_hit_ratio = membership_hit_ratio
+            self.equivalence_hit_ratio = equivalence_hit_ratio
+            self.longest_cached_prefix = longest_cached_prefix
+            self.projected_time = projected_time
+            self.measured_time = measured_time
+            self.set_phase_metrics(phase_metric_stats)
         
         @staticmethod
-        def pretty_printed_attr():
-            return {
+        def pretty_printed_attr(instrumented=False):
+            attributes = {
                 "Conformance (coverage) %" : "conformance_coverage",
                 "Random sample" : "random_sample_size",
                 "Active Queries" : "performed_queries",
                 "Cache hits": "cache_hits",
-                "Learning rounds" : "learning_rounds"
+                "Learning rounds" : "learning_rounds",
+                "Correctly learned model" : "correctly_learned_model",
+                "Cache nodes" : "cache_nodes",
+                "Cache memory (KiB)" : "cache_memory_kib",
+                "Membership query hit ratio %" : "membership_hit_ratio",
+                "Equivalence query hit ratio %" : "equivalence_hit_ratio",
+                "Longest cached prefix" : "longest_cached_prefix",
+                "Projected time (s)" : "projected_time",
+                "Measured time (s)" : "measured_time"
             }
+            if instrumented:
+                attributes.update(phase_columns(cached_l_star_phases))
+            return attributes
 
 class DataExporter:
 
@@ -1,15 +1,18 @@
 from collections import defaultdict
-from os import listdir
+from math import sqrt
 from statistics import stdev, mean
-
-from aalpy.utils import load_automaton_from_file
+from types import SimpleNamespace
 
 from csv_export import LStarExportEntry, RPNIExportEntry, CachedLStarExportEntry
+from instrumentation import phase_attr, phase_metrics, l_star_phases, rpni_phases, cached_l_star_phases
+from model_cache import ModelCache, iter_dot_files
 
 
 class LStarExperiment:
     def __init__(self, model_size, output_queries, steps_output_queries, eq_oracle_queries, steps_eq_queries,
-                 learning_rounds, conformance_coverage, conformance_random) -> None:
+                 learning_rounds, conformance_coverage, conformance_random, correctly_learned_model,
+                 projected_time=0, measured_time=0, phases=None, conformance_random_bound=0,
+                 random_test_cases_used=0, posed_queries=None, posed_steps=None) -> None:
         self.model_size = model_size
         self.output_queries = output_queries
         self.steps_output_queries = steps_output_queries
@@ -20,37 +23,167 @@ class LStarExperiment:
         self.learning_rounds = learning_rounds
         self.sum_queries = output_queries + eq_oracle_queries
         self.sum_steps = steps_output_queries + steps_eq_queries
-        self.average_trace_len = self.sum_steps / self.sum_queries
+        # queries and steps posed by L*, from which the passive samples are sized; more than sum_queries and sum_steps
+        # if only the queries executed on the system are reported (see query_cache.PersistentCacheSUL)
+        self.posed_queries = posed_queries if posed_queries is not None else self.sum_queries
+        self.posed_steps = posed_steps if posed_steps is not None else self.sum_steps
+        self.average_trace_len = self.posed_steps / self.posed_queries
+        self.correctly_learned_model = correctly_learned_model
+        # simulated device time and measured wall-clock time of learning
+        self.projected_time = projected_time
+        self.measured_time = measured_time
+        # phase -> metrics, if the experiment was instrumented
+        self.phases = phases
+        # half width of the confidence interval of conformance_random in percentage points of conforming test cases (0
+        # if all random test cases were evaluated) and number of evaluated random test cases
+        self.conformance_random_bound = conformance_random_bound
+        self.random_test_cases_used = random_test_cases_used
 
 
 class RPNIExperiment:
     def __init__(self, model_size, conformance_coverage, conformance_random, data_size, average_len,
-                 correctly_learned_model) -> None:
+                 correctly_learned_model, counterexample=None, projected_time=0, measured_time=0,
+                 phases=None, conformance_random_bound=0, random_test_cases_used=0) -> None:
         self.model_size = model_size
         self.conformance_coverage = conformance_coverage
         self.conformance_random = conformance_random
         self.data_size = data_size
         self.average_len = average_len
         self.correctly_learned_model = correctly_learned_model
+        self.counterexample = counterexample
+        # simulated device time and measured wall-clock time of collecting the data
+        self.projected_time = projected_time
+        self.measured_time = measured_time
+        # phase -> metrics, if the experiment was instrumented
+        self.phases = phases
+        # half width of the confidence interval of conformance_random in percentage points of conforming test cases (0
+        # if all random test cases were evaluated) and number of evaluated random test cases
+        self.conformance_random_bound = conformance_random_bound
+        self.random_test_cases_used = random_test_cases_used
 
 
 class CachedLStarExperiment:
     def __init__(self, conformance_coverage, random_sample_size, performed_queries, cache_hits,
-                 learning_rounds) -> None:
+                 learning_rounds, correctly_learned_model, cache_nodes, cache_memory_kib, membership_hit_ratio,
+                 equivalence_hit_ratio, longest_cached_prefix, projected_time=0, measured_time=0,
+                 phases=None) -> None:
         self.conformance_coverage = conformance_coverage
         self.random_sample_size = random_sample_size
         self.performed_queries = performed_queries
         self.cache_hits = cache_hits
         self.learning_rounds = learning_rounds
+        self.correctly_learned_model = correctly_learned_model
+        self.cache_nodes = cache_nodes
+        self.cache_memory_kib = cache_memory_kib
+        self.membership_hit_ratio = membership_hit_ratio
+        self.equivalence_hit_ratio = equivalence_hit_ratio
+        self.longest_cached_prefix = longest_cached_prefix
+        # simulated device time and measured wall-clock time of collecting the cached data and learning
+        self.projected_time = projected_time
+        self.measured_time = measured_time
+        # phase -> metrics, if the experiment was instrumented
+        self.phases = phases
+
+
+class RunningStats:
+    """
+    Mean and sample standard deviation of a stream of values, updated in one pass with Welford's algorithm.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.mean = 0.
+        self._squared_distances = 0.
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._squared_distances += delta * (value - self.mean)
+
+    def stdev(self):
+        return sqrt(self._squared_distances / (self.count - 1)) if self.count > 1 else 0
+
+
+class RunAggregate:
+    """
+    Aggregate of the runs of one experiment as read from a ResultsStore: RunningStats of every numeric field and the
+    fields of the first run, so memory does not grow with the number of runs. The summaries accept it in place of a
+    list of experiment records; indexing returns the first run.
+    """
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.fields = dict()
+        self.first_run = None
+
+    def __len__(self):
+        return self.runs
+
+    def __getitem__(self, index):
+        if index != 0 or self.first_run is None:
+            raise IndexError('only the first run of an aggregate is kept')
+        return SimpleNamespace(**self.first_run)
+
+    def add(self, run):
+        self.runs += 1
+        if self.first_run is None:
+            self.first_run = dict(run)
+        for field, value in run.items():
+            if isinstance(value, (bool, int, float)):
+                self.fields.setdefault(field, RunningStats()).add(value)
+
+    def stats(self, field):
+        field_stats = self.fields[field]
+        return field_stats.mean, field_stats.stdev()
+
+
+def correctly_learned_count(experiment_data):
+    if isinstance(experiment_data, RunAggregate):
+        return round(experiment_data.fields['correctly_learned_model'].total)
+    return len([elem for elem in experiment_data if elem.correctly_learned_model])
 
 
 def data_stats(field, l_star_data):
+    if isinstance(l_star_data, RunAggregate):
+        return l_star_data.stats(field)
     field_data = [getattr(elem, field) for elem in l_star_data]
     field_data_average = mean(field_data)
-    field_data_stdev = stdev(field_data)
+    field_data_stdev = stdev(field_data) if len(field_data) > 1 else 0
     return field_data_average, field_data_stdev
 
 
+def phase_stats(experiment_data, phases):
+    """
+    Average and standard deviation of every metric of the given phases, keyed by the attribute name of the export
+    entry. Empty if the experiments were not instrumented.
+    """
+    if isinstance(experiment_data, RunAggregate):
+        attrs = [phase_attr(phase, metric) for phase in phases for metric in phase_metrics]
+        return {attr: experiment_data.stats(attr) for attr in attrs if attr in experiment_data.fields}
+
+    instrumented = [elem.phases for elem in experiment_data if elem.phases is not None]
+    stats = dict()
+    if not instrumented:
+        return stats
+    for phase in phases:
+        for metric in phase_metrics:
+            values = [elem.get(phase, dict()).get(metric, 0) for elem in instrumented]
+            stats[phase_attr(phase, metric)] = (mean(values), stdev(values) if len(values) > 1 else 0)
+    return stats
+
+
+def print_phase_stats(stats, phases):
+    for phase in phases:
+        wall_time = stats[phase_attr(phase, 'wall_time')]
+        cpu_time = stats[phase_attr(phase, 'cpu_time')]
+        peak_memory = stats[phase_attr(phase, 'peak_memory_kib')]
+        print(f'Phase {phase}: wall time (s) {wall_time[0]} ({wall_time[1]}), CPU time (s) {cpu_time[0]} '
+              f'({cpu_time[1]}), peak memory (KiB) {peak_memory[0]} ({peak_memory[1]})')
+
+
 def l_star_summary(l_star_experiment_data, verbose):
     number_states = data_stats("model_size", l_star_experiment_data)
     learning_rounds = data_stats("learning_rounds", l_star_experiment_data)
@@ -61,8 +194,14 @@ def l_star_summary(l_star_experiment_data, verbose):
     average_trace_len = data_stats("average_trace_len", l_star_experiment_data)
     conformance_coverage = data_stats("conformance_coverage", l_star_experiment_data)
     conformance_random = data_stats("conformance_random", l_star_experiment_data)
+    conformance_random_bound = data_stats("conformance_random_bound", l_star_experiment_data)
+    random_test_cases_used = data_stats("random_test_cases_used", l_star_experiment_data)
     sum_queries = data_stats("sum_queries", l_star_experiment_data)
     sum_steps = data_stats("sum_steps", l_star_experiment_data)
+    correctly_learned_model = correctly_learned_count(l_star_experiment_data)
+    projected_time = data_stats("projected_time", l_star_experiment_data)
+    measured_time = data_stats("measured_time", l_star_experiment_data)
+    phase_metric_stats = phase_stats(l_star_experiment_data, l_star_phases)
 
     if verbose:
         print(f'\n----L* summary----')
@@ -75,15 +214,25 @@ def l_star_summary(l_star_experiment_data, verbose):
         print(f'Average trace length: {average_trace_len[0]} ({average_trace_len[1]})')
         print(f'Conformance (coverage): {conformance_coverage[0]} ({conformance_coverage[1]})')
         print(f'Conformance (random): {conformance_random[0]} ({conformance_random[1]})')
+        print(f'Conformance (random) bound (pp): {conformance_random_bound[0]} ({conformance_random_bound[1]})')
+        print(f'Random test cases: {random_test_cases_used[0]} ({random_test_cases_used[1]})')
+        print(f'Correctly learned models: {correctly_learned_model}/{len(l_star_experiment_data)}')
+        print(f'Projected time (s): {projected_time[0]} ({projected_time[1]})')
+        print(f'Measured time (s): {measured_time[0]} ({measured_time[1]})')
+        if phase_metric_stats:
+            print_phase_stats(phase_metric_stats, l_star_phases)
 
     return LStarExportEntry(number_states, output_queries, steps_output_queries, eq_oracle_queries, steps_eq_queries,
-                            conformance_coverage, learning_rounds, sum_queries, sum_steps, average_trace_len)
+                            conformance_coverage, learning_rounds, sum_queries, sum_steps, average_trace_len,
+                            (correctly_learned_model, 0), projected_time, measured_time, conformance_random,
+                            conformance_random_bound, random_test_cases_used, phase_metric_stats)
 
 
 def rpni_summary(rpni_experiment_data, rpni_data_names, minimized_l_star, verbose):
     rpni_export_data = defaultdict(RPNIExportEntry)
 
     minimized_l_star_data = rpni_experiment_data[minimized_l_star][0]
+    minimized_phase_stats = phase_stats(rpni_experiment_data[minimized_l_star], rpni_phases)
 
     if verbose:
         print(f'\n----RPNI summary----')
@@ -93,13 +242,27 @@ def rpni_summary(rpni_experiment_data, rpni_data_names, minimized_l_star, verbos
         print(f'Average trace length: {minimized_l_star_data.average_len}')
         print(f'Conformance (coverage): {minimized_l_star_data.conformance_coverage}')
         print(f'Conformance (random): {minimized_l_star_data.conformance_random}')
+        print(f'Conformance (random) bound (pp): {minimized_l_star_data.conformance_random_bound}')
+        print(f'Random test cases: {minimized_l_star_data.random_test_cases_used}')
+        print(f'Correctly learned model: {minimized_l_star_data.correctly_learned_model}')
+        if minimized_l_star_data.counterexample is not None:
+            print(f'Shortest counterexample: {minimized_l_star_data.counterexample}')
+        print(f'Data collection projected time (s): {minimized_l_star_data.projected_time}')
+        print(f'Data collection measured time (s): {minimized_l_star_data.measured_time}')
+        if minimized_phase_stats:
+            print_phase_stats(minimized_phase_stats, rpni_phases)
 
-    minimized_l_star_data_correct = 1 if minimized_l_star_data.conformance_coverage == 100 else 0
+    minimized_l_star_data_correct = 1 if minimized_l_star_data.correctly_learned_model else 0
     rpni_export_data[minimized_l_star] = RPNIExportEntry((minimized_l_star_data.model_size, 0),
                                                          (minimized_l_star_data.conformance_coverage, 0),
                                                          (minimized_l_star_data.conformance_random, 0),
                                                          (minimized_l_star_data.data_size, 0),
-                                                         (minimized_l_star_data.average_len, 0), (minimized_l_star_data_correct, 0))
+                                                         (minimized_l_star_data.average_len, 0), (minimized_l_star_data_correct, 0),
+                                                         (minimized_l_star_data.projected_time, 0),
+                                                         (minimized_l_star_data.measured_time, 0),
+                                                         (minimized_l_star_data.conformance_random_bound, 0),
+                                                         (minimized_l_star_data.random_test_cases_used, 0),
+                                                         minimized_phase_stats)
 
     for experiment_name in rpni_data_names:
         number_states = data_stats("model_size", rpni_experiment_data[experiment_name])
@@ -107,12 +270,17 @@ def rpni_summary(rpni_experiment_data, rpni_data_names, minimized_l_star, verbos
         average_len = data_stats("average_len", rpni_experiment_data[experiment_name])
         conformance_coverage = data_stats("conformance_coverage", rpni_experiment_data[experiment_name])
         conformance_random = data_stats("conformance_random", rpni_experiment_data[experiment_name])
-        correctly_learned_model = [getattr(elem, "correctly_learned_model") for elem in
-                                   rpni_experiment_data[experiment_name] if
-                                   getattr(elem, "correctly_learned_model") == True]
+        correctly_learned_model = correctly_learned_count(rpni_experiment_data[experiment_name])
+        projected_time = data_stats("projected_time", rpni_experiment_data[experiment_name])
+        measured_time = data_stats("measured_time", rpni_experiment_data[experiment_name])
+        conformance_random_bound = data_stats("conformance_random_bound", rpni_experiment_data[experiment_name])
+        random_test_cases_used = data_stats("random_test_cases_used", rpni_experiment_data[experiment_name])
+        phase_metric_stats = phase_stats(rpni_experiment_data[experiment_name], rpni_phases)
 
         rpni_export_data[experiment_name] = RPNIExportEntry(number_states, conformance_coverage, conformance_random,
-                                                            data_size, average_len, (len(correctly_learned_model), 0))
+                                                            data_size, average_len, (correctly_learned_model, 0),
+                                                            projected_time, measured_time, conformance_random_bound,
+                                                            random_test_cases_used, phase_metric_stats)
 
         if verbose:
             print(f'\n--Experiment: {experiment_name}')
@@ -121,8 +289,14 @@ def rpni_summary(rpni_experiment_data, rpni_data_names, minimized_l_star, verbos
             print(f'Average trace length: {average_len[0]} ({average_len[1]})')
             print(f'Conformance (coverage): {conformance_coverage[0]} ({conformance_coverage[1]})')
             print(f'Conformance (random): {conformance_random[0]} ({conformance_random[1]})')
+            print(f'Conformance (random) bound (pp): {conformance_random_bound[0]} ({conformance_random_bound[1]})')
+            print(f'Random test cases: {random_test_cases_used[0]} ({random_test_cases_used[1]})')
             print(
-                f'Correctly learned models: {len(correctly_learned_model)}/{len(rpni_experiment_data[experiment_name])}')
+                f'Correctly learned models: {correctly_learned_model}/{len(rpni_experiment_data[experiment_name])}')
+            print(f'Data collection projected time (s): {projected_time[0]} ({projected_time[1]})')
+            print(f'Data collection measured time (s): {measured_time[0]} ({measured_time[1]})')
+            if phase_metric_stats:
+                print_phase_stats(phase_metric_stats, rpni_phases)
 
     return rpni_export_data
 
@@ -133,6 +307,15 @@ def cached_l_star_summary(cached_l_star_experiment_data, verbose):
     performed_queries = data_stats("performed_queries", cached_l_star_experiment_data)
     cache_hits = data_stats("cache_hits", cached_l_star_experiment_data)
     learning_rounds = data_stats("learning_rounds", cached_l_star_experiment_data)
+    correctly_learned_model = correctly_learned_count(cached_l_star_experiment_data)
+    cache_nodes = data_stats("cache_nodes", cached_l_star_experiment_data)
+    cache_memory_kib = data_stats("cache_memory_kib", cached_l_star_experiment_data)
+    membership_hit_ratio = data_stats("membership_hit_ratio", cached_l_star_experiment_data)
+    equivalence_hit_ratio = data_stats("equivalence_hit_ratio", cached_l_star_experiment_data)
+    longest_cached_prefix = data_stats("longest_cached_prefix", cached_l_star_experiment_data)
+    projected_time = data_stats("projected_time", cached_l_star_experiment_data)
+    measured_time = data_stats("measured_time", cached_l_star_experiment_data)
+    phase_metric_stats = phase_stats(cached_l_star_experiment_data, cached_l_star_phases)
 
     if verbose:
         print(f'\n----Cached L* summary----')
@@ -141,16 +324,27 @@ def cached_l_star_summary(cached_l_star_experiment_data, verbose):
         print(f'Performed queries: {performed_queries[0]} ({performed_queries[1]})')
         print(f'Cached Queries: {cache_hits[0]} ({cache_hits[1]})')
         print(f'Learning Rounds: {learning_rounds[0]} ({learning_rounds[1]})')
+        print(f'Correctly learned models: {correctly_learned_model}/{len(cached_l_star_experiment_data)}')
+        print(f'Cache nodes: {cache_nodes[0]} ({cache_nodes[1]})')
+        print(f'Cache memory (KiB): {cache_memory_kib[0]} ({cache_memory_kib[1]})')
+        print(f'Membership query hit ratio %: {membership_hit_ratio[0]} ({membership_hit_ratio[1]})')
+        print(f'Equivalence query hit ratio %: {equivalence_hit_ratio[0]} ({equivalence_hit_ratio[1]})')
+        print(f'Longest cached prefix: {longest_cached_prefix[0]} ({longest_cached_prefix[1]})')
+        print(f'Projected time (s): {projected_time[0]} ({projected_time[1]})')
+        print(f'Measured time (s): {measured_time[0]} ({measured_time[1]})')
+        if phase_metric_stats:
+            print_phase_stats(phase_metric_stats, cached_l_star_phases)
 
     return CachedLStarExportEntry(conformance_coverage, random_sample_size, performed_queries, cache_hits,
-                                  learning_rounds)
+                                  learning_rounds, (correctly_learned_model, 0), cache_nodes, cache_memory_kib,
+                                  membership_hit_ratio, equivalence_hit_ratio, longest_cached_prefix, projected_time,
+                                  measured_time, phase_metric_stats)
 
 
-def load_dot_files(benchmark):
-    loaded_models = []
-    for dot_file in listdir(f'./automata/{benchmark}'):
-        if dot_file[-4:] == ".dot":
-            model_name = dot_file[:-4]
-            model = load_automaton_from_file(f'./automata/{benchmark}/{dot_file}', automaton_type='mealy')
-            loaded_models.append((model_name, model))
-    return loaded_models
+def load_dot_files(benchmark, models=None, use_cache=True):
+    """
+    Loads the models of a benchmark, optionally only the ones whose name matches one of the names or glob patterns in
+    models. Parsed models are kept in a ModelCache unless use_cache is False.
+    """
+    cache = ModelCache() if use_cache else None
+    return list(iter_dot_files(benchmark, models, cache))
@@ -1,26 +1,86 @@
 import random
+from array import array
+from itertools import islice
 from tokenize import Double
 
-from aalpy.SULs import MealySUL
-from aalpy.base.SUL import CacheSUL
 from aalpy.learning_algs import run_Lstar
-from aalpy.utils.HelperFunctions import all_prefixes
+
+from compiled_automata import CompiledMealySUL
+from model_analysis import model_analysis
+from prefix_trie import PrefixTrie, SampleView
+from query_cache import TelemetryCacheSUL
 
 
 class DataSet:
 
-    def __init__(self, data, size, steps) -> None:
+    def __init__(self, data, size, steps, sequences=None) -> None:
         self.data = data
         self.size = size
         self.steps = steps
+        # sampled input sequences, i.e. the queries needed to collect the data
+        self.sequences = sequences
 
     def average_len(self) -> Double:
         return self.steps / self.size
 
+    def view(self):
+        return self.data
 
-def data_from_l_star_E_set(hypothesis, e_set, include_extended_s_set=True, prefix_closed=True, verbose=False):
-    observation_table_data = []
-    prefixes = [state.prefix for state in hypothesis.states]
+
+class CompactDataSet(DataSet):
+    """
+    DataSet stored in a PrefixTrie: every sample and every sampled sequence is a single trie node, so shared prefixes
+    are stored once and inputs and outputs are interned. data_nodes are the nodes of the samples in data order; if
+    they are None, the data is prefix-closed and consists of all nodes of the trie in insertion order.
+
+    data decodes the samples into a list of (input sequence, output) pairs on first access and keeps it, view()
+    returns a SampleView on the trie without copying.
+    """
+
+    def __init__(self, trie: PrefixTrie, size, steps, sequence_nodes, data_nodes=None) -> None:
+        self.trie = trie
+        self.data_nodes = data_nodes if data_nodes is not None else range(1, len(trie))
+        self.sequence_nodes = sequence_nodes
+        self.size = size
+        self.steps = steps
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = list(self.view())
+        return self._data
+
+    @property
+    def sequences(self):
+        return [self.trie.prefix(node) for node in self.sequence_nodes]
+
+    def view(self):
+        return SampleView(self.trie, self.data_nodes)
+
+
+def compact_data_set(model, sequences, prefix_closed=True):
+    """
+    Labels sequences with the output of their last input. With prefix_closed, every distinct prefix of the sequences is
+    labelled instead, in the order of their first occurrence. The sequences are inserted into a PrefixTrie labelled
+    with the model, so the model is stepped once per trie node and the samples are stored as trie nodes.
+    """
+    trie = PrefixTrie(model)
+    sequence_nodes = array('l', (trie.insert(seq) for seq in sequences))
+    steps = sum(trie.depth(node) for node in sequence_nodes)
+    trie.seal()
+    return CompactDataSet(trie, len(sequence_nodes), steps, sequence_nodes, None if prefix_closed else sequence_nodes)
+
+
+def e_set_sequences(hypothesis, e_set, include_extended_s_set=True):
+    """
+    Sequences of the observation table cells, i.e. every state prefix (and its one-input extensions) followed by every
+    suffix of the E-set, without duplicates and in a fixed order.
+    """
+    # prefixes of a loaded model are only set once it was used for test case generation
+    state_cover = model_analysis(hypothesis).state_cover()
+    prefixes = [state.prefix if state.prefix is not None else prefix
+                for state, prefix in zip(hypothesis.states, state_cover)]
 
     if include_extended_s_set:
         extended_prefixes = []
@@ -30,108 +90,116 @@ def data_from_l_star_E_set(hypothesis, e_set, include_extended_s_set=True, prefi
 
         prefixes.extend(extended_prefixes)
 
-    data_set_tmp = set()
-
-    data_set = set()
+    # dict is used as insertion-ordered set, so that the order of the data does not depend on string hashing
+    data_set_tmp = dict()
     for prefix in prefixes:
         for suffix in e_set:
-            cell = prefix + suffix
-            data_set_tmp.add(cell)
-            if prefix_closed:
-                data_set.update(all_prefixes(cell))
-            else:
-                data_set.add(cell)
+            data_set_tmp[prefix + suffix] = None
+    return list(data_set_tmp)
 
-    sequence_step_sum = sum([len(i) for i in data_set_tmp])
-    data_set_size = len(data_set_tmp)
+
+def data_from_l_star_E_set(hypothesis, e_set, include_extended_s_set=True, prefix_closed=True, verbose=False):
+    sequences = e_set_sequences(hypothesis, e_set, include_extended_s_set)
+
+    sequence_step_sum = sum([len(i) for i in sequences])
+    data_set_size = len(sequences)
 
     if verbose:
-        print(f'Number of samples provided to RPNI: {len(data_set_tmp)}')
+        print(f'Number of samples provided to RPNI: {len(sequences)}')
         print(f'Average length of samples provided to RPNI: {round(sequence_step_sum/data_set_size, 2)}')
 
-    for seq in list(data_set):
-        output = hypothesis.compute_output_seq(hypothesis.initial_state, seq)[-1]
-        observation_table_data.append((seq, output))
-
-    return DataSet(observation_table_data, data_set_size, sequence_step_sum)
+    return compact_data_set(hypothesis, sequences, prefix_closed)
 
 
 def data_from_computed_e_set(hypothesis, include_extended_s_set=True, prefix_closed=True, verbose=False):
-    return data_from_l_star_E_set(hypothesis, hypothesis.compute_characterization_set(), include_extended_s_set,
-                                  prefix_closed, verbose)
+    return data_from_l_star_E_set(hypothesis, sorted(model_analysis(hypothesis).characterization_set()),
+                                  include_extended_s_set, prefix_closed, verbose)
 
 
 def minimized_char_set_data(hypothesis, include_extended_s_set=True, prefix_closed=True, verbose=False):
-    from aalpy.learning_algs.deterministic_passive.rpni_helper_functions import extract_unique_sequences, createPTA
-    data = data_from_computed_e_set(hypothesis, include_extended_s_set, prefix_closed)
-    input_sequences = []
-    for seq in extract_unique_sequences(createPTA(data.data, automaton_type='mealy')):
-        input_sequences.append([io[0][0] for io in seq])
-
-    sequence_step_sum = sum([len(i) for i in input_sequences])
-    average_length = sequence_step_sum / len(input_sequences)
-
-    data_set_size = len(input_sequences)
+    """
+    Observation table data of the computed characterization set, reduced to the maximal sequences (sequences that are
+    not a prefix of another one). The cells are labelled once while they are inserted into a PrefixTrie, and the data
+    is read from its nodes.
+    """
+    sequences = e_set_sequences(hypothesis, sorted(model_analysis(hypothesis).characterization_set()),
+                                include_extended_s_set)
+    if not prefix_closed:
+        # without prefixes, the order of the leaves is the one of a PTA built from the sequences sorted by length
+        sequences.sort(key=len)
+
+    trie = PrefixTrie(hypothesis)
+    for seq in sequences:
+        trie.insert(seq)
+
+    trie.seal()
+    leaves = array('l', trie.leaves())
+    sequence_step_sum = sum(trie.depth(node) for node in leaves)
+    average_length = sequence_step_sum / len(leaves)
+
+    data_set_size = len(leaves)
     data_set_steps = sequence_step_sum
 
     if verbose:
         print(f'Number of samples provided to RPNI: {data_set_size}')
         print(f'Average length of samples provided to RPNI: {round(average_length, 2)}')
 
-    if prefix_closed:
-        prefix_closed_seq = set()
-        for seq in input_sequences:
-            prefix_closed_seq.update(all_prefixes(seq))
-        input_sequences = list(prefix_closed_seq)
+    data_nodes = array('l', trie.preorder()) if prefix_closed else leaves
 
-    pruned_data = []
-    for seq in input_sequences:
-        output = hypothesis.compute_output_seq(hypothesis.initial_state, seq)[-1]
-        pruned_data.append((seq, output))
+    return CompactDataSet(trie, data_set_size, data_set_steps, leaves, data_nodes)
 
-    return DataSet(pruned_data, data_set_size, data_set_steps)
 
+def random_sequences(input_alphabet, num_sequences, min_sequence_len, max_sequence_len):
+    """
+    Lazily draws random input sequences, one at a time and in the same order of random draws as a list of all of them.
+    """
+    for _ in range(num_sequences):
+        yield random.choices(input_alphabet, k=random.randint(min_sequence_len, max_sequence_len))
 
-def generate_random_data(model, num_sequences, min_sequence_len, max_sequence_len, verbose=False, prefix_closed=True):
-    data = []
-    input_alphabet = model.get_input_alphabet()
-    random_sequences = [random.choices(input_alphabet, k=random.randint(min_sequence_len, max_sequence_len))
-                        for _ in range(num_sequences)]
 
-    sequence_step_sum = sum([len(i) for i in random_sequences])
-    data_length = len(random_sequences)
+def generate_random_data(model, num_sequences, min_sequence_len, max_sequence_len, verbose=False, prefix_closed=True):
+    """
+    Random sequences are inserted into the PrefixTrie of the data set as they are drawn.
+    """
+    data_set = compact_data_set(model, random_sequences(model.get_input_alphabet(), num_sequences, min_sequence_len,
+                                                        max_sequence_len), prefix_closed)
 
     if verbose:
-        print(f'Number of samples provided to RPNI: {len(random_sequences)}')
-        print(f'Average length of samples provided to RPNI: {round(sequence_step_sum/data_length, 2)}')
+        print(f'Number of samples provided to RPNI: {data_set.size}')
+        print(f'Average length of samples provided to RPNI: {round(data_set.average_len(), 2)}')
+
+    return data_set
 
-    if prefix_closed:
-        prefix_closed_seq = set()
-        for seq in random_sequences:
-            prefix_closed_seq.update(all_prefixes(seq))
-        random_sequences = list(prefix_closed_seq)
 
-    for seq in random_sequences:
-        output = model.compute_output_seq(model.initial_state, seq)[-1]
-        data.append((seq, output))
+def generate_nested_random_data(model, sample_sizes, min_sequence_len, max_sequence_len, verbose=False,
+                                prefix_closed=True):
+    """
+    Yields a random DataSet for every sample size in increasing order. Every sample starts with the sequences of all
+    smaller samples, so that it can be learned incrementally (see IncrementalRPNI). All samples share one PrefixTrie,
+    into which the sequences of a sample are drawn only when it is requested.
+    """
+    sequences = random_sequences(model.get_input_alphabet(), max(sample_sizes), min_sequence_len, max_sequence_len)
 
-    return DataSet(data, data_length, sequence_step_sum)
+    trie = PrefixTrie(model)
+    sequence_nodes = array('l')
+    sequence_step_sum = 0
+    for num_sequences in sorted(sample_sizes):
+        for seq in islice(sequences, num_sequences - len(sequence_nodes)):
+            sequence_nodes.append(trie.insert(seq))
+            sequence_step_sum += len(seq)
 
+        if verbose:
+            print(f'Number of samples provided to RPNI: {num_sequences}')
+            print(f'Average length of samples provided to RPNI: {round(sequence_step_sum/num_sequences, 2)}')
 
-def l_star_with_populated_cache(model, cache_data, eq_oracle):
-    # Note: This circumvents the fact if the data is not prefix-closed
-    cache_io_seq = []
-    for seq in cache_data:
-        i = seq[0]
-        o = model.compute_output_seq(model.initial_state, i)
-        cache_io_seq.append(zip(i, o))
+        yield CompactDataSet(trie, num_sequences, sequence_step_sum, sequence_nodes[:num_sequences],
+                             None if prefix_closed else sequence_nodes[:num_sequences])
 
-    sul = CacheSUL(MealySUL(model))
 
-    for sample in cache_io_seq:
-        sul.cache.reset()
-        for i, o in sample:
-            sul.cache.step_in_cache(i, o)
+def l_star_with_populated_cache(model, cache_data, eq_oracle, sul=None):
+    # the model labels sequences whose prefixes are not contained in the data
+    sul = TelemetryCacheSUL(sul if sul is not None else CompiledMealySUL(model))
+    sul.preload(cache_data, model)
 
     alphabet = model.get_input_alphabet()
 
@@ -140,4 +208,4 @@ def l_star_with_populated_cache(model, cache_data, eq_oracle):
     cache_hits = sul.num_cached_queries
     queries_posed = data['queries_learning'] + data['queries_eq_oracle'] - cache_hits
 
-    return l_star_model, queries_posed, cache_hits, data['learning_rounds']
+    return l_star_model, queries_posed, cache_hits, data['learning_rounds'], sul.telemetry()
@@ -0,0 +1,345 @@
+import random
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from hashlib import sha256
+from types import SimpleNamespace
+
+from aalpy.oracles import StatePrefixEqOracle
+
+from compiled_automata import CompiledMealySUL, model_fingerprint
+from data_classes import data_stats
+from data_generation import generate_random_data, minimized_char_set_data
+from instrumentation import PhaseRecorder, measure, profiled, data_generation_phase
+from learning_setups import l_star_experiment, rpni_experiment, l_star_with_initial_cache
+from query_cache import PersistentCacheSUL
+from simulated_device import DevicePool, SimulatedDeviceSUL
+
+l_star_str = "l*"
+cached_l_star_str = "cached l*"
+# rpni_model_l_star_str = "l* data"
+rpni_model_random_l_star_length_str = "random |l* data|"
+rpni_model_random_large_set_str = "random 2*|l* data|"
+rpni_model_random_long_traces_str = "random long traces"
+rpni_model_minimized_char_set_str = "l* data (minimized)"
+# rpni_model_random_good_enough_str = "random corr"
+
+rpni_data_names = [rpni_model_random_l_star_length_str, rpni_model_random_large_set_str,
+                   rpni_model_random_long_traces_str]
+
+# experiments that can be selected; L* is always executed, as the passive experiments are sized by its queries
+experiment_types = ['lstar', 'rpni', 'cached-lstar']
+
+
+def task_seed(seed, *key):
+    """
+    Derives the seed of a single experiment unit from the base seed and the unit key. Independent of the process and
+    of PYTHONHASHSEED, so every unit draws the same random numbers no matter where it is executed.
+    """
+    digest = sha256(repr((seed,) + key).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class ModelResults:
+    def __init__(self) -> None:
+        self.l_star_data = []
+        self.rpni_data = defaultdict(list)
+        self.cached_l_star_data = []
+
+
+class ExperimentUnit:
+    def __init__(self, kind, model_name, repeat, learning_queries=None, max_sequence_length=None) -> None:
+        self.kind = kind
+        self.model_name = model_name
+        self.repeat = repeat
+        self.learning_queries = learning_queries
+        self.max_sequence_length = max_sequence_length
+
+    def key(self):
+        return self.kind, self.model_name, self.repeat
+
+
+# state shared by all units executed in one process, set once per worker by _init_worker
+_context = dict()
+
+
+def _init_worker(benchmark_models, test_cases_coverage, test_cases_random, seed, walks_per_state, walk_len, verbose,
+                 latencies=None, devices=1, time_scale=0, instrument=False, profile_dir=None,
+                 sequential_conformance=None, rpni_engine='aalpy', query_cache=None, trace_memory=False,
+                 cache_accounting='uncached'):
+    _context['models'] = dict(benchmark_models)
+    _context['test_cases_coverage'] = test_cases_coverage
+    _context['test_cases_random'] = test_cases_random
+    _context['seed'] = seed
+    _context['walks_per_state'] = walks_per_state
+    _context['walk_len'] = walk_len
+    _context['verbose'] = verbose
+    _context['latencies'] = latencies
+    _context['devices'] = devices
+    _context['time_scale'] = time_scale
+    _context['instrument'] = instrument
+    _context['profile_dir'] = profile_dir
+    _context['sequential_conformance'] = sequential_conformance
+    _context['rpni_engine'] = rpni_engine
+    _context['query_cache'] = query_cache
+    _context['trace_memory'] = trace_memory
+    _context['cache_accounting'] = cache_accounting
+
+
+def _eq_oracle(model):
+    return StatePrefixEqOracle(model.get_input_alphabet(), CompiledMealySUL(model),
+                               walks_per_state=_context['walks_per_state'], walk_len=_context['walk_len'])
+
+
+def _device_sul(model, unit):
+    """
+    SUL of the active learning units; a simulated device if device latencies are configured, behind a persistent
+    query cache if one is configured. The cache tree of a model is shared by all models with the same structure.
+    """
+    sul = CompiledMealySUL(model)
+    if _context['latencies'] is not None:
+        sul = SimulatedDeviceSUL(sul, _context['latencies'], seed=task_seed(_context['seed'], 'device', *unit.key()),
+                                 time_scale=_context['time_scale'])
+    if _context['query_cache'] is not None:
+        sul = PersistentCacheSUL(sul, _context['query_cache'], model_fingerprint(model), _context['cache_accounting'])
+    return sul
+
+
+def _device_pool(model, unit):
+    """
+    Simulated devices that time the collection of passive learning data, None if no device latencies are configured.
+    """
+    if _context['latencies'] is None:
+        return None
+    return DevicePool(lambda: CompiledMealySUL(model), _context['latencies'], devices=_context['devices'],
+                      seed=task_seed(_context['seed'], 'device pool', *unit.key()), time_scale=_context['time_scale'])
+
+
+def _generate_rpni_data(data_name, model, unit):
+    random.seed(task_seed(_context['seed'], data_name, unit.model_name, unit.repeat))
+    verbose = _context['verbose']
+
+    if data_name == rpni_model_random_l_star_length_str:
+        return generate_random_data(model, num_sequences=unit.learning_queries, min_sequence_len=1,
+                                    max_sequence_len=unit.max_sequence_length, verbose=verbose)
+    if data_name == rpni_model_random_large_set_str:
+        return generate_random_data(model, num_sequences=(unit.learning_queries * 2), min_sequence_len=1,
+                                    max_sequence_len=unit.max_sequence_length, verbose=verbose)
+    if data_name == rpni_model_random_long_traces_str:
+        return generate_random_data(model, num_sequences=unit.learning_queries, min_sequence_len=model.size,
+                                    max_sequence_len=(model.size * 2), verbose=verbose)
+    # good enough data (randomly generated data that learns correctly) data_random_good_enough =
+    # generate_random_data(model, num_sequences= learning_queries * 1, min_sequence_len=model_size,
+    # max_sequence_len=max(10,model_size)  + model_size, verbose=verbose)
+    assert data_name == rpni_model_minimized_char_set_str
+    return minimized_char_set_data(model, include_extended_s_set=True, verbose=verbose)
+
+
+def _run_unit(unit):
+    """
+    Executes a unit, recording its phases if instrumentation is enabled and profiling it if a profile directory is
+    configured.
+    """
+    recorder = PhaseRecorder(_context['trace_memory']) if _context['instrument'] else None
+    with profiled(_context['profile_dir'], ' '.join(map(str, unit.key()))):
+        return _execute_unit(unit, recorder)
+
+
+def _execute_unit(unit, recorder):
+    model = _context['models'][unit.model_name]
+    test_cases_coverage = _context['test_cases_coverage'][unit.model_name]
+    test_cases_random = _context['test_cases_random'][unit.model_name]
+
+    if unit.kind == l_star_str:
+        random.seed(task_seed(_context['seed'], *unit.key()))
+        return l_star_experiment(model, test_cases_coverage, test_cases_random, model.get_input_alphabet(),
+                                 _eq_oracle(model), _device_sul(model, unit), recorder,
+                                 _context['sequential_conformance'])
+
+    if unit.kind == cached_l_star_str:
+        # the cache is populated with the same sample as the 'random |l* data|' RPNI experiment of this repetition
+        with measure(recorder, data_generation_phase):
+            data = _generate_rpni_data(rpni_model_random_l_star_length_str, model, unit)
+        random.seed(task_seed(_context['seed'], *unit.key()))
+        return l_star_with_initial_cache(data, model, _eq_oracle(model), test_cases_coverage, _device_sul(model, unit),
+                                         _device_pool(model, unit), recorder)
+
+    with measure(recorder, data_generation_phase):
+        data = _generate_rpni_data(unit.kind, model, unit)
+    return rpni_experiment(data, model, test_cases_coverage, test_cases_random, device_pool=_device_pool(model, unit),
+                           recorder=recorder, sequential_conformance=_context['sequential_conformance'],
+                           rpni_engine=_context['rpni_engine'])
+
+
+class _SerialExecutor:
+    """
+    Executes submitted units immediately in the current process.
+    """
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self):
+        pass
+
+
+def create_executor(workers, initializer, initargs):
+    """
+    Returns a process pool with the given number of workers, or an executor running everything in the current process
+    if workers <= 1. The initializer is executed once per process in both cases.
+    """
+    if workers <= 1:
+        initializer(*initargs)
+        return _SerialExecutor()
+    return ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+
+
+class ExperimentRunner:
+    """
+    Splits the experiments of main.py into (experiment, model, repetition) units and executes them either serially or
+    on a process pool. Every unit is seeded with task_seed, so the results do not depend on the number of workers.
+    The RPNI and cached L* units of a model are scheduled as soon as all its L* repetitions are finished, as their
+    sample sizes are derived from the L* results. Only the given experiments (see experiment_types) are executed.
+    If device latencies are given, active learning runs on a SimulatedDeviceSUL, the collection of passive learning
+    data is timed on a DevicePool with the given number of devices, and the experiments report projected and measured
+    times.
+    With instrument, every unit records wall time and CPU time of its phases, with trace_memory also their peak
+    memory, which slows them down (see PhaseRecorder); with a profile_dir, every unit is profiled with cProfile and
+    its statistics are dumped to that directory. With SequentialConformance
+    settings, the L* and RPNI units estimate their random conformance sequentially. The RPNI units learn with the
+    given rpni_engine (see learning_setups.rpni_engines). With a query_cache database, the active units query the
+    model through a PersistentCacheSUL with the given cache_accounting; the passive units are sized by the queries
+    posed by L* in either case.
+    With a ResultsStore, every record is appended to the store as soon as its unit is finished and only the L* records
+    needed to schedule the passive units are kept in memory; units checkpointed in the store are not executed again.
+    """
+
+    def __init__(self, benchmark_models, test_cases_coverage, test_cases_random, repeats=5, workers=1, seed=None,
+                 walks_per_state=25, walk_len=30, verbose=False, latencies=None, devices=1, time_scale=0,
+                 instrument=False, profile_dir=None, sequential_conformance=None, store=None,
+                 rpni_engine='aalpy', query_cache=None, experiments=None, trace_memory=False,
+                 cache_accounting='uncached') -> None:
+        self.benchmark_models = benchmark_models
+        self.experiments = experiments if experiments is not None else experiment_types
+        assert set(self.experiments) <= set(experiment_types)
+        self.store = store
+        self.repeats = repeats
+        self.workers = workers
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.worker_args = (benchmark_models, test_cases_coverage, test_cases_random, self.seed, walks_per_state,
+                            walk_len, verbose, latencies, devices, time_scale, instrument, profile_dir,
+                            sequential_conformance, rpni_engine, query_cache, trace_memory, cache_accounting)
+
+    def _passive_units(self, model_name, model_results):
+        avg_query_steps = data_stats("average_trace_len", model_results.l_star_data)[0]
+        max_sequence_length = round((avg_query_steps - 0.5) * 2)
+        learning_queries = round(data_stats("posed_queries", model_results.l_star_data)[0])
+
+        units = []
+        for repeat in range(self.repeats):
+            if 'rpni' in self.experiments:
+                for data_name in rpni_data_names:
+                    units.append(ExperimentUnit(data_name, model_name, repeat, learning_queries, max_sequence_length))
+            if 'cached-lstar' in self.experiments:
+                units.append(ExperimentUnit(cached_l_star_str, model_name, repeat, learning_queries,
+                                            max_sequence_length))
+        if 'rpni' in self.experiments:
+            units.append(ExperimentUnit(rpni_model_minimized_char_set_str, model_name, 0))
+        return units
+
+    def _recover(self, finished, finished_l_star_runs):
+        """
+        Restores the store after an interruption and loads the L* records of the checkpointed units, from which the
+        passive units are scheduled.
+
+        Returns:
+
+            keys of the units that are completed already
+
+        """
+        if self.store is None:
+            return set()
+        completed = self.store.recover()
+        for row in self.store.rows('LStarExperiment'):
+            # records of runs before posed_queries was recorded report all posed queries
+            row.setdefault('posed_queries', row['sum_queries'])
+            finished[(row['experiment'], row['model'], row['repeat'])] = SimpleNamespace(**row)
+            finished_l_star_runs[row['model']] += 1
+        return completed
+
+    def _submit(self, executor, pending, units, completed):
+        for unit in units:
+            if unit.key() not in completed:
+                pending[executor.submit(_run_unit, unit)] = unit
+
+    def _l_star_finished(self, model_name, results, finished):
+        """
+        Collects the L* records of a model and returns its passive units.
+        """
+        model_results = results[model_name]
+        model_results.l_star_data = [finished[(l_star_str, model_name, r)] for r in range(self.repeats)]
+        passive_units = self._passive_units(model_name, model_results)
+        if self.store is not None:
+            del results[model_name]
+            for r in range(self.repeats):
+                del finished[(l_star_str, model_name, r)]
+        return passive_units
+
+    def run(self):
+        """
+        Executes all units. With a store, units that are checkpointed in it are skipped, so an interrupted run is
+        resumed by running it again on the same store.
+
+        Returns:
+
+            ModelResults per model name, or None if the results are written to a store
+
+        """
+        results = {model_name: ModelResults() for model_name, _ in self.benchmark_models}
+        # results are collected per unit key and merged in a fixed order, independent of the completion order
+        finished = dict()
+        finished_l_star_runs = defaultdict(int)
+        completed = self._recover(finished, finished_l_star_runs)
+
+        executor = create_executor(self.workers, _init_worker, self.worker_args)
+        try:
+            pending = dict()
+            for model_name, _ in self.benchmark_models:
+                self._submit(executor, pending, [ExperimentUnit(l_star_str, model_name, repeat)
+                                                 for repeat in range(self.repeats)], completed)
+                if finished_l_star_runs[model_name] == self.repeats:
+                    self._submit(executor, pending, self._l_star_finished(model_name, results, finished), completed)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit = pending.pop(future)
+                    if self.store is not None:
+                        self.store.append(unit.model_name, unit.kind, unit.repeat, future.result())
+                    if self.store is None or unit.kind == l_star_str:
+                        finished[unit.key()] = future.result()
+
+                    if unit.kind == l_star_str:
+                        finished_l_star_runs[unit.model_name] += 1
+                        if finished_l_star_runs[unit.model_name] == self.repeats:
+                            self._submit(executor, pending, self._l_star_finished(unit.model_name, results, finished),
+                                         completed)
+        finally:
+            executor.shutdown()
+
+        if self.store is not None:
+            return None
+
+        for model_name, model_results in results.items():
+            for repeat in range(self.repeats):
+                if 'rpni' in self.experiments:
+                    for data_name in rpni_data_names:
+                        model_results.rpni_data[data_name].append(finished[(data_name, model_name, repeat)])
+                if 'cached-lstar' in self.experiments:
+                    model_results.cached_l_star_data.append(finished[(cached_l_star_str, model_name, repeat)])
+            if 'rpni' in self.experiments:
+                model_results.rpni_data[rpni_model_minimized_char_set_str].append(
+                    finished[(rpni_model_minimized_char_set_str, model_name, 0)])
+
+        return results
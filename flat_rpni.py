@@ -0,0 +1,179 @@
+import time
+from array import array
+
+from instrumentation import measure, merging_phase
+from prefix_trie import SampleView
+from rpni_pta import FlatPTA, complete_model, insert_red, report_non_deterministic_data
+
+
+class FlatRPNI:
+    """
+    RPNI for Mealy machines on a FlatPTA. States of the hypothesis are union-find classes of PTA nodes. A merge is
+    folded directly into the arrays and every change is logged, so a merge that turns out to be incompatible is
+    rolled back by undoing its log, without copying the PTA as aalpy's RPNI does.
+
+    Red-blue decisions (including tie-breaking and the order of transitions) follow aalpy's RPNI, so the learned model
+    is the same as the one of run_RPNI. Data has to be prefix-closed; it is a list of (input sequence, output) pairs
+    or a SampleView.
+    """
+
+    def __init__(self, data, print_info=False) -> None:
+        self.print_info = print_info
+        self.pta = FlatPTA()
+        self.merge_checks = 0
+
+        pta_construction_start = time.time()
+        if isinstance(data, SampleView):
+            self.deterministic = self.pta.insert_nodes(data.trie, data.nodes, array('l', [0]))
+        else:
+            self.deterministic = self.pta.insert(data)
+        if self.deterministic:
+            self.pta.check_prefix_closed(type(self).__name__)
+        if self.print_info:
+            print(f'PTA Construction Time: {round(time.time() - pta_construction_start, 2)}')
+
+    def run(self, input_completeness=None):
+        """
+        Returns:
+
+            learned model, or None if data is non-deterministic
+
+        """
+        if not self.deterministic:
+            report_non_deterministic_data()
+            return None
+        return self._learn(input_completeness)
+
+    def _learn(self, input_completeness, recorder=None):
+        start_time = time.time()
+        with measure(recorder, merging_phase):
+            red = self._run()
+        if self.print_info:
+            print(f'\nRPNI Learning Time: {round(time.time() - start_time, 2)}')
+            print(f'RPNI Learned {len(red)} state automaton.')
+
+        with measure(recorder, merging_phase):
+            learned_model = self.pta.to_automaton(red, self._find, self.class_transitions, self.class_input_order)
+            return complete_model(learned_model, input_completeness, self.print_info)
+
+    def _find(self, node):
+        rep = self.rep
+        while rep[node] != node:
+            # path halving; only done between merges, as it would have to be undone otherwise
+            rep[node] = rep[rep[node]]
+            node = rep[node]
+        return node
+
+    def _candidates(self, blue_node, red):
+        """
+        Red states the blue state is tried to be merged with, in this order (all of them; see IncrementalRPNI).
+        """
+        return red
+
+    def _decided(self, blue_node, red_node):
+        """
+        Called after the blue state was merged with red_node, or promoted if red_node is None.
+        """
+
+    def _run(self):
+        pta = self.pta
+        num_nodes = len(pta)
+        self.rep = array('l', range(num_nodes))
+        # transitions and input order of the classes, indexed by their representative
+        self.class_transitions = array('l', pta.transitions)
+        self.class_input_order = [list(order) for order in pta.input_order]
+
+        k, depth, class_transitions = pta.k, pta.depth, self.class_transitions
+        is_red = bytearray(num_nodes)
+        is_red[0] = 1
+        red = [0]
+
+        while True:
+            blue = []
+            for r in red:
+                for i in self.class_input_order[r]:
+                    c = self._find(class_transitions[r * k + i])
+                    if not is_red[c]:
+                        blue.append(c)
+            if not blue:
+                break
+            lex_min_blue = min(blue, key=lambda x: depth[x])
+
+            merged_with = None
+            for red_state in self._candidates(lex_min_blue, red):
+                self.merge_checks += 1
+                if self._merge(red_state, lex_min_blue):
+                    merged_with = red_state
+                    break
+
+            if merged_with is None:
+                insert_red(red, depth, lex_min_blue)
+                is_red[lex_min_blue] = 1
+                if self.print_info:
+                    print(f'\rCurrent automaton size: {len(red)}', end="")
+            self._decided(lex_min_blue, merged_with)
+
+        return red
+
+    def _merge(self, red_node, blue_node):
+        """
+        Merges the class of blue_node into the class of red_node and folds their successors, in the order of aalpy's
+        recursive fold. If two merged classes disagree on an output, the log of the merge is undone and False is
+        returned.
+        """
+        k, rep, outputs = self.pta.k, self.rep, self.pta.outputs
+        class_transitions, class_input_order = self.class_transitions, self.class_input_order
+        # class representatives that were absorbed (>= 0) and added transitions (~index)
+        undo = []
+
+        def find(node):
+            while rep[node] != node:
+                node = rep[node]
+            return node
+
+        rep[blue_node] = red_node
+        undo.append(blue_node)
+        stack = [[red_node, blue_node, 0]]
+        while stack:
+            frame = stack[-1]
+            x, y, position = frame
+            y_inputs = class_input_order[y]
+            while position < len(y_inputs):
+                i = y_inputs[position]
+                position += 1
+                child = class_transitions[y * k + i]
+                red_child = class_transitions[x * k + i]
+                if red_child < 0:
+                    class_transitions[x * k + i] = child
+                    class_input_order[x].append(i)
+                    undo.append(~(x * k + i))
+                    continue
+                if outputs[red_child] != outputs[child]:
+                    self._rollback(undo)
+                    return False
+                red_child, child = find(red_child), find(child)
+                if red_child != child:
+                    rep[child] = red_child
+                    undo.append(child)
+                    frame[2] = position
+                    stack.append([red_child, child, 0])
+                    break
+            else:
+                stack.pop()
+        return True
+
+    def _rollback(self, undo):
+        for change in reversed(undo):
+            if change >= 0:
+                self.rep[change] = change
+            else:
+                index = ~change
+                self.class_transitions[index] = -1
+                self.class_input_order[index // self.pta.k].pop()
+
+
+def run_flat_rpni(data, input_completeness=None, print_info=False):
+    """
+    Drop-in replacement for run_RPNI(data, 'mealy', input_completeness, print_info) based on FlatRPNI.
+    """
+    return FlatRPNI(data, print_info).run(input_completeness)
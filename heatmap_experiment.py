@@ -1,51 +1,291 @@
-from math import sqrt
+import argparse
+import os
+import random
+import sys
+from concurrent.futures import as_completed, wait, FIRST_COMPLETED
 
-from aalpy.SULs import MealySUL
-from aalpy.learning_algs import run_Lstar, run_RPNI
+from aalpy.learning_algs import run_Lstar
 from aalpy.oracles import StatePrefixEqOracle
 from aalpy.utils import load_automaton_from_file
 
-from data_generation import generate_random_data
+from checkpoint import CheckpointFile
+from compiled_automata import CompiledMealySUL, model_fingerprint
+from data_generation import generate_random_data, generate_nested_random_data
+from experiment_runner import create_executor, task_seed
+from incremental_rpni import IncrementalRPNI
+from learning_setups import learn_rpni, rpni_engines
 from model_comparison import create_test_cases, compare_learned_models
+from suite_cache import SuiteCache
 
 
-def increasing_parameters_exp(model):
-    sul = MealySUL(model)
-    alphabet = model.get_input_alphabet()
-    eq_oracle = StatePrefixEqOracle(alphabet, sul, walks_per_state=25, walk_len=25)
+# sample sizes (multiples of the number of L* queries) and trace lengths of the heatmap
+num_of_queries_multipliers = list(range(1, 11))
+num_of_steps = list(range(5, 26, 2))
 
-    l_star_model, data = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0, return_data=True)
+# state of the process executing heatmap cells, set once per worker by _init_worker
+_context = dict()
 
-    learning_queries = data['queries_learning'] + data['queries_eq_oracle']
-    avg_query_steps = int((data['steps_learning'] + data['steps_eq_oracle']) / learning_queries)
 
-    validation_test_cases = create_test_cases([('ex1', model)], 10000, 'coverage')['ex1']
+def _init_worker(model, validation_test_cases, seed, print_info, rpni_engine='aalpy'):
+    _context['model'] = model
+    _context['validation_test_cases'] = validation_test_cases
+    _context['seed'] = seed
+    _context['print_info'] = print_info
+    _context['rpni_engine'] = rpni_engine
 
-    experiment_data = []
 
-    num_of_queries_multipliers = list(range(1, 11))
-    num_of_steps = list(range(5, 26, 2))
+def _run_cell(num_sequences, steps):
+    model = _context['model']
+    random.seed(task_seed(_context['seed'], 'heatmap cell', num_sequences, steps))
 
-    for query_multiplier in num_of_queries_multipliers:
+    random_data = generate_random_data(model, num_sequences=num_sequences, min_sequence_len=steps - 2,
+                                       max_sequence_len=steps + 2)
+
+    rpni_model = learn_rpni(random_data, _context['rpni_engine'], print_info=_context['print_info'])
+
+    non_conformance = compare_learned_models(model, rpni_model, _context['validation_test_cases'])
+    conformance = round((1 - non_conformance) * 100, 2)
+
+    return num_sequences, steps, conformance
+
+
+def _run_row(sample_sizes, steps):
+    """
+    Learns all cells of one trace length from nested samples with a single incremental RPNI learner.
+    """
+    model = _context['model']
+    random.seed(task_seed(_context['seed'], 'heatmap row', steps))
+
+    learner = IncrementalRPNI(print_info=_context['print_info'])
+    cells = []
+    for random_data in generate_nested_random_data(model, sample_sizes, min_sequence_len=steps - 2,
+                                                   max_sequence_len=steps + 2):
+        rpni_model = learner.update(random_data.view(), input_completeness='sink_state')
+
+        non_conformance = compare_learned_models(model, rpni_model, _context['validation_test_cases'])
+        cells.append((random_data.size, steps, round((1 - non_conformance) * 100, 2)))
+
+    return cells
+
+
+def _identity(model):
+    return {'model': model_fingerprint(model), 'num_of_queries_multipliers': num_of_queries_multipliers,
+            'num_of_steps': num_of_steps}
+
+
+def check_heatmap_settings(settings, model, seed=None, checkpoint_path=None):
+    """
+    Raises a ValueError if the settings of a checkpoint were not created for the model, the grid and (if given) the
+    seed.
+    """
+    mismatches = [name for name, value in _identity(model).items() if settings.get(name) != value]
+    if seed is not None and seed != settings['seed']:
+        mismatches.append('seed')
+    if mismatches:
+        raise ValueError(f'checkpoint {checkpoint_path} was created with another {", ".join(mismatches)}; '
+                         f'remove it or choose another checkpoint')
+
+
+def _prepare(model, checkpoint_path, seed):
+    """
+    Loads the checkpoint, or determines the number of L* queries (the unit of the sample sizes) for a new one. A
+    checkpoint is only resumed for the model, grid and seed (if one is given) it was created with, otherwise a
+    ValueError is raised.
+
+    Returns:
+
+        checkpoint (or None), seed, number of L* queries, validation test cases and the cells of the checkpoint
+
+    """
+    checkpoint = CheckpointFile(checkpoint_path) if checkpoint_path else None
+    records = checkpoint.load() if checkpoint else []
+
+    settings = next((r for r in records if r['type'] == 'settings'), None)
+    if settings is not None:
+        check_heatmap_settings(settings, model, seed, checkpoint_path)
+    else:
+        seed = seed if seed is not None else random.randrange(2 ** 32)
+        random.seed(task_seed(seed, 'l*'))
+
+        sul = CompiledMealySUL(model)
+        alphabet = model.get_input_alphabet()
+        eq_oracle = StatePrefixEqOracle(alphabet, sul, walks_per_state=25, walk_len=25)
+
+        l_star_model, data = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0, return_data=True)
+
+        learning_queries = data['queries_learning'] + data['queries_eq_oracle']
+        settings = {'type': 'settings', 'seed': seed, 'learning_queries': learning_queries, **_identity(model)}
+        if checkpoint:
+            checkpoint.append(settings)
+
+    seed, learning_queries = settings['seed'], settings['learning_queries']
+
+    validation_test_cases = create_test_cases([('ex1', model)], 10000, 'coverage', seed=seed,
+                                              cache=SuiteCache())['ex1']
+
+    experiment_data = {(r['sample_size'], r['steps']): r['conformance'] for r in records if r['type'] == 'cell'}
+    return checkpoint, seed, learning_queries, validation_test_cases, experiment_data
+
+
+def _store_cell(experiment_data, checkpoint, sample_size, steps, conformance):
+    experiment_data[(sample_size, steps)] = conformance
+    if checkpoint:
+        checkpoint.append({'type': 'cell', 'sample_size': sample_size, 'steps': steps, 'conformance': conformance})
+
+
+def increasing_parameters_exp(model, checkpoint_path=None, workers=1, seed=None, print_info=True, incremental=False,
+                              rpni_engine='aalpy'):
+    """
+    Learns the model with RPNI from random samples of increasing size and trace length and returns a list of
+    (sample size, trace length, conformance) cells. If a checkpoint path is given, every finished cell is appended to
+    the checkpoint immediately and cells already contained in it are not learned again.
+
+    If incremental is set, the samples of one trace length are nested (every sample contains the smaller ones) and
+    are learned with one IncrementalRPNI learner, which saves building the PTA and searching merges again, but still
+    performs the merges of every sample of the row.
+    Otherwise, every cell is learned with the given rpni_engine ('aalpy' or 'flat', see flat_rpni.FlatRPNI).
+    """
+    checkpoint, seed, learning_queries, validation_test_cases, experiment_data = _prepare(model, checkpoint_path, seed)
+
+    executor = create_executor(workers, _init_worker, (model, validation_test_cases, seed, print_info, rpni_engine))
+    try:
+        pending = []
+        sample_sizes = [query_multiplier * learning_queries for query_multiplier in num_of_queries_multipliers]
         for steps in num_of_steps:
-            random_data = generate_random_data(model, num_sequences=query_multiplier * learning_queries,
-                                               min_sequence_len=steps - 2, max_sequence_len=steps + 2)
+            missing = [sample_size for sample_size in sample_sizes if (sample_size, steps) not in experiment_data]
+            if incremental and missing:
+                # the whole row is learned again, as the samples of missing cells contain the smaller samples
+                pending.append(executor.submit(_run_row, sample_sizes, steps))
+            elif missing:
+                pending.extend(executor.submit(_run_cell, sample_size, steps) for sample_size in missing)
+
+        for future in as_completed(pending):
+            cells = future.result() if incremental else [future.result()]
+            for sample_size, steps, conformance in cells:
+                if (sample_size, steps) in experiment_data:
+                    continue
+                _store_cell(experiment_data, checkpoint, sample_size, steps, conformance)
+    finally:
+        executor.shutdown()
+
+    return sorted((sample_size, steps, conformance) for (sample_size, steps), conformance in experiment_data.items())
+
+
+class _RowSearch:
+    """
+    Searches the smallest sample size of one trace length whose conformance reaches the threshold, assuming that
+    conformance does not decrease with the sample size. The largest sample size of the grid is checked first; if it
+    is sufficient, the grid sizes in between the largest insufficient (lo) and the smallest sufficient size (hi) are
+    bisected. Afterwards, refinement_steps further bisection steps between lo and hi refine the result below the
+    resolution of the grid.
+    """
+
+    def __init__(self, steps, sample_sizes, threshold, refinement_steps=0) -> None:
+        self.steps = steps
+        self.sample_sizes = sorted(sample_sizes)
+        self.threshold = threshold
+        self.refinement_steps = refinement_steps
+        self.refinements = 0
+        self.lo, self.hi = 0, None
+
+    def next_sample_size(self):
+        """
+        Next sample size to evaluate, or None if the search is finished.
+        """
+        if self.hi is None:
+            return self.sample_sizes[-1] if self.lo < self.sample_sizes[-1] else None
+        between = [sample_size for sample_size in self.sample_sizes if self.lo < sample_size < self.hi]
+        if between:
+            return between[len(between) // 2]
+        if self.refinements < self.refinement_steps and self.hi - self.lo > 1:
+            return (self.lo + self.hi) // 2
+        return None
+
+    def record(self, sample_size, conformance):
+        if sample_size not in self.sample_sizes:
+            self.refinements += 1
+        if conformance >= self.threshold:
+            self.hi = sample_size
+        else:
+            self.lo = sample_size
+
+
+def minimal_sample_sizes(model, threshold=100, checkpoint_path=None, workers=1, seed=None, print_info=True,
+                         refinement_steps=0, rpni_engine='aalpy'):
+    """
+    Adaptive variant of increasing_parameters_exp: instead of learning every cell of the heatmap, the smallest
+    sufficient sample size (conformance >= threshold) of every trace length is searched by bisection (see _RowSearch),
+    which needs about log2 of the number of cells of a row. Cells are learned exactly as in
+    increasing_parameters_exp, so both share their checkpoint cells.
+
+    Returns:
+
+        learned (sample size, trace length, conformance) cells and a dict mapping every trace length to its smallest
+        sufficient sample size, or None if even the largest sample size is insufficient
+
+    """
+    checkpoint, seed, learning_queries, validation_test_cases, experiment_data = _prepare(model, checkpoint_path, seed)
+    sample_sizes = [query_multiplier * learning_queries for query_multiplier in num_of_queries_multipliers]
+    searches = [_RowSearch(steps, sample_sizes, threshold, refinement_steps) for steps in num_of_steps]
 
-            rpni_model = run_RPNI(random_data.data, 'mealy', print_info=True, input_completeness='sink_state')
+    executor = create_executor(workers, _init_worker, (model, validation_test_cases, seed, print_info, rpni_engine))
+    try:
+        pending = dict()
 
-            non_conformance = compare_learned_models(model, rpni_model, validation_test_cases)
-            conformance = round((1 - non_conformance) * 100, 2)
+        def advance(search):
+            # records cells of the checkpoint until a cell has to be learned
+            sample_size = search.next_sample_size()
+            while sample_size is not None and (sample_size, search.steps) in experiment_data:
+                search.record(sample_size, experiment_data[(sample_size, search.steps)])
+                sample_size = search.next_sample_size()
+            if sample_size is not None:
+                pending[executor.submit(_run_cell, sample_size, search.steps)] = search
 
-            experiment_data.append((query_multiplier * learning_queries, steps, conformance))
+        for search in searches:
+            advance(search)
 
-    return experiment_data
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                search = pending.pop(future)
+                sample_size, steps, conformance = future.result()
+                _store_cell(experiment_data, checkpoint, sample_size, steps, conformance)
+                advance(search)
+    finally:
+        executor.shutdown()
 
+    cells = sorted((sample_size, steps, conformance) for (sample_size, steps), conformance in experiment_data.items())
+    return cells, {search.steps: search.hi for search in searches}
 
-def plot_heatmap(experiment_data):
+
+def load_heatmap_checkpoint(checkpoint_path):
+    records = CheckpointFile(checkpoint_path).load()
+    return sorted((r['sample_size'], r['steps'], r['conformance']) for r in records if r['type'] == 'cell')
+
+
+def load_heatmap_settings(checkpoint_path):
+    records = CheckpointFile(checkpoint_path).load()
+    return next((r for r in records if r['type'] == 'settings'), None)
+
+
+def plot_heatmap(experiment_data=None, checkpoint_path=None, title='Mosquitto MQTT Broker', learning_queries=None):
+    """
+    Plots the cells as heatmap, cells that were not learned (e.g. by minimal_sample_sizes) are left blank. Sample
+    sizes are labelled as multiples of learning_queries, which is read from the checkpoint if not given. Cells of
+    sample sizes between the grid sizes (learned by the refinement steps of minimal_sample_sizes) are not plotted.
+    """
     import matplotlib.pylab as plt
     import seaborn as sns
 
-    num_increases = int(sqrt(len(experiment_data)))
+    if experiment_data is None:
+        experiment_data = load_heatmap_checkpoint(checkpoint_path)
+        if learning_queries is None:
+            settings = load_heatmap_settings(checkpoint_path)
+            learning_queries = settings['learning_queries'] if settings else None
+
+    if learning_queries:
+        grid_sizes = {query_multiplier * learning_queries for query_multiplier in num_of_queries_multipliers}
+        experiment_data = [cell for cell in experiment_data if cell[0] in grid_sizes]
 
     exp_data_values = {(i[0], i[1]): i[2] for i in experiment_data}
 
@@ -56,22 +296,24 @@ def plot_heatmap(experiment_data):
     for i in x:
         row = []
         for j in y:
-            row.append(exp_data_values[(i, j)])
+            row.append(exp_data_values.get((i, j), float('nan')))
         row.reverse()
         z_2d_array.append(row)
 
     # transpose
     z_2d_array = list(map(list, zip(*z_2d_array)))
+    missing_cells = [[value != value for value in row] for row in z_2d_array]
 
     # round to ints
     # z_2d_array = [[round(i) for i in row] for row in z_2d_array]
 
     # x as a multiplier
-    x = list(range(1, 11))
-    fig = sns.heatmap(z_2d_array, xticklabels=x, yticklabels=sorted(y, reverse=True), annot=True, fmt='g', cmap="Greens")
+    x = [round(i / learning_queries, 2) for i in x] if learning_queries else list(range(1, len(x) + 1))
+    fig = sns.heatmap(z_2d_array, mask=missing_cells, xticklabels=x, yticklabels=sorted(y, reverse=True), annot=True,
+                      fmt='g', cmap="Greens")
     fig.set_xlabel('Sample size multiplier relative to L*')
     fig.set_ylabel('Average query length')
-    fig.set_title('Mosquitto MQTT Broker')
+    fig.set_title(title)
     plt.show()
     #plt.savefig('mqtt_heatmap.pdf', dpi=300)
     return
@@ -79,14 +321,76 @@ def plot_heatmap(experiment_data):
     tikzplotlib.save("bluetooth_heatmap.tex")
 
 
-if __name__ == '__main__':
-    # model = load_automaton_from_file('automata/MQTT/mosquitto__two_client_will_retain.dot', automaton_type='mealy')
-    # experiment_data = increasing_parameters_exp(model)
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog,
+                                     description='Conformance heatmap of RPNI over sample size and trace length.')
+    parser.add_argument('model', nargs='*', default=['automata/MQTT/mosquitto__two_client_will_retain.dot'],
+                        help='models; with several models, the checkpoint of each model is suffixed with its name')
+    parser.add_argument('--checkpoint', default='heatmap_checkpoint.jsonl',
+                        help='cells are stored in and resumed from this file, which is only resumed for the model, '
+                             'grid and seed it was created with')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--plot-only', action='store_true', help='plot the cells stored in the checkpoint')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--incremental', action='store_true',
+                      help='learn nested samples of each trace length with incremental RPNI')
+    mode.add_argument('--adaptive', action='store_true',
+                      help='only search the smallest sample size of each trace length that reaches the threshold')
+    parser.add_argument('--threshold', type=float, default=100, help='conformance threshold of --adaptive')
+    parser.add_argument('--rpni-engine', choices=rpni_engines, default='aalpy',
+                        help='RPNI implementation learning the cells (not used with --incremental)')
+    parser.add_argument('--refinement-steps', type=int, default=0,
+                        help='bisection steps of --adaptive below the resolution of the grid (the refined sample '
+                             'sizes are printed, but not plotted)')
+    args = parser.parse_args(argv)
 
-    experiment_data = [(3697, 5, 62.97), (3697, 7, 85.2), (3697, 9, 83.9), (3697, 11, 86.54), (3697, 13, 89.61), (3697, 15, 93.79), (3697, 17, 96.46), (3697, 19, 97.21), (3697, 21, 93.88), (3697, 23, 95.2), (3697, 25, 96.62), (7394, 5, 78.61), (7394, 7, 84.79), (7394, 9, 89.65), (7394, 11, 97.96), (7394, 13, 96.62), (7394, 15, 97.33), (7394, 17, 96.99), (7394, 19, 99.22), (7394, 21, 96.64), (7394, 23, 97.55), (7394, 25, 97.94), (11091, 5, 73.4), (11091, 7, 86.08), (11091, 9, 90.5), (11091, 11, 97.55), (11091, 13, 96.56), (11091, 15, 98.85), (11091, 17, 98.87), (11091, 19, 99.03), (11091, 21, 98.84), (11091, 23, 98.88), (11091, 25, 98.94), (14788, 5, 79.72), (14788, 7, 89.67), (14788, 9, 94.84), (14788, 11, 96.28), (14788, 13, 97.3), (14788, 15, 98.64), (14788, 17, 98.45), (14788, 19, 99.14), (14788, 21, 99.08), (14788, 23, 99.04), (14788, 25, 99.92), (18485, 5, 82.36), (18485, 7, 88.9), (18485, 9, 95.32), (18485, 11, 98.91), (18485, 13, 97.5), (18485, 15, 98.14), (18485, 17, 99.14), (18485, 19, 98.7), (18485, 21, 99.55), (18485, 23, 98.95), (18485, 25, 99.17), (22182, 5, 77.67), (22182, 7, 94.5), (22182, 9, 96.56), (22182, 11, 98.41), (22182, 13, 98.85), (22182, 15, 99.79), (22182, 17, 99.94), (22182, 19, 99.98), (22182, 21, 100.0), (22182, 23, 100.0), (22182, 25, 98.81), (25879, 5, 84.09), (25879, 7, 93.56), (25879, 9, 98.8), (25879, 11, 98.22), (25879, 13, 98.33), (25879, 15, 99.25), (25879, 17, 99.98), (25879, 19, 99.7), (25879, 21, 100.0), (25879, 23, 99.95), (25879, 25, 100.0), (29576, 5, 86.03), (29576, 7, 94.13), (29576, 9, 99.03), (29576, 11, 98.28), (29576, 13, 98.92), (29576, 15, 99.18), (29576, 17, 99.91), (29576, 19, 100.0), (29576, 21, 100.0), (29576, 23, 99.99), (29576, 25, 100.0), (33273, 5, 78.83), (33273, 7, 97.4), (33273, 9, 98.53), (33273, 11, 98.96), (33273, 13, 99.06), (33273, 15, 98.99), (33273, 17, 98.9), (33273, 19, 99.31), (33273, 21, 100.0), (33273, 23, 100.0), (33273, 25, 100.0), (36970, 5, 80.88), (36970, 7, 96.28), (36970, 9, 98.23), (36970, 11, 98.9), (36970, 13, 99.55), (36970, 15, 99.48), (36970, 17, 99.55), (36970, 19, 99.95), (36970, 21, 99.79), (36970, 23, 100.0), (36970, 25, 100.0)]
-    print(experiment_data)
+    checkpoint_paths = dict()
+    for model_path in args.model:
+        checkpoint_paths[model_path] = args.checkpoint
+        if len(args.model) > 1:
+            root, extension = os.path.splitext(args.checkpoint)
+            checkpoint_paths[model_path] = f'{root}_{os.path.splitext(os.path.basename(model_path))[0]}{extension}'
+
+    # checkpoints are checked before any model is learned, so that a mismatch does not stop the run halfway
+    models = dict()
+    if not args.plot_only:
+        for model_path, checkpoint_path in checkpoint_paths.items():
+            models[model_path] = load_automaton_from_file(model_path, automaton_type='mealy')
+            settings = load_heatmap_settings(checkpoint_path)
+            if settings is not None:
+                try:
+                    check_heatmap_settings(settings, models[model_path], args.seed, checkpoint_path)
+                except ValueError as e:
+                    parser.error(str(e))
+
+    for model_path, checkpoint_path in checkpoint_paths.items():
+        if not args.plot_only:
+            model = models[model_path]
+            if args.adaptive:
+                experiment_data, minimal_sizes = minimal_sample_sizes(model, args.threshold, checkpoint_path,
+                                                                      workers=args.workers, seed=args.seed,
+                                                                      refinement_steps=args.refinement_steps,
+                                                                      rpni_engine=args.rpni_engine)
+                learning_queries = load_heatmap_settings(checkpoint_path)['learning_queries']
+                print(f'{model_path}: {len(experiment_data)} cells learned')
+                for steps, sample_size in minimal_sizes.items():
+                    multiplier = round(sample_size / learning_queries, 2) if sample_size else None
+                    print(f'Trace length {steps}: minimal sample size {sample_size} (multiplier {multiplier})')
+            else:
+                experiment_data = increasing_parameters_exp(model, checkpoint_path, workers=args.workers,
+                                                            seed=args.seed, incremental=args.incremental,
+                                                            rpni_engine=args.rpni_engine)
+                print(experiment_data)
+
+        plot_heatmap(checkpoint_path=checkpoint_path, title=model_path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
 
-    plot_heatmap(experiment_data)
+# Results of previous runs:
 
 # automata/BLE/CC2640R2-no-feature-req.dot
 # [(979, 5, 52.94), (979, 7, 69.98), (979, 9, 72.36), (979, 11, 78.52), (979, 13, 75.97), (979, 15, 87.17), (979, 17, 78.81), (979, 19, 84.64), (979, 21, 92.25), (979, 23, 90.67), (979, 25, 95.02), (1958, 5, 55.94), (1958, 7, 76.97), (1958, 9, 88.47), (1958, 11, 90.76), (1958, 13, 87.76), (1958, 15, 93.41), (1958, 17, 98.21), (1958, 19, 98.62), (1958, 21, 100.0), (1958, 23, 93.98), (1958, 25, 100.0), (2937, 5, 67.97), (2937, 7, 75.67), (2937, 9, 87.88), (2937, 11, 90.72), (2937, 13, 92.69), (2937, 15, 98.62), (2937, 17, 100.0), (2937, 19, 98.35), (2937, 21, 100.0), (2937, 23, 100.0), (2937, 25, 100.0), (3916, 5, 66.33), (3916, 7, 83.22), (3916, 9, 87.55), (3916, 11, 93.87), (3916, 13, 100.0), (3916, 15, 98.41), (3916, 17, 100.0), (3916, 19, 100.0), (3916, 21, 100.0), (3916, 23, 100.0), (3916, 25, 100.0), (4895, 5, 72.25), (4895, 7, 84.23), (4895, 9, 89.89), (4895, 11, 98.32), (4895, 13, 100.0), (4895, 15, 100.0), (4895, 17, 100.0), (4895, 19, 100.0), (4895, 21, 100.0), (4895, 23, 100.0), (4895, 25, 100.0), (5874, 5, 72.78), (5874, 7, 86.53), (5874, 9, 92.21), (5874, 11, 95.63), (5874, 13, 100.0), (5874, 15, 100.0), (5874, 17, 98.52), (5874, 19, 98.68), (5874, 21, 100.0), (5874, 23, 100.0), (5874, 25, 100.0), (6853, 5, 67.72), (6853, 7, 84.52), (6853, 9, 95.75), (6853, 11, 100.0), (6853, 13, 100.0), (6853, 15, 100.0), (6853, 17, 100.0), (6853, 19, 100.0), (6853, 21, 100.0), (6853, 23, 100.0), (6853, 25, 100.0), (7832, 5, 76.23), (7832, 7, 86.27), (7832, 9, 96.65), (7832, 11, 100.0), (7832, 13, 98.28), (7832, 15, 100.0), (7832, 17, 100.0), (7832, 19, 100.0), (7832, 21, 100.0), (7832, 23, 100.0), (7832, 25, 100.0), (8811, 5, 77.28), (8811, 7, 95.56), (8811, 9, 95.46), (8811, 11, 100.0), (8811, 13, 100.0), (8811, 15, 100.0), (8811, 17, 100.0), (8811, 19, 100.0), (8811, 21, 100.0), (8811, 23, 100.0), (8811, 25, 100.0), (9790, 5, 76.55), (9790, 7, 89.38), (9790, 9, 97.0), (9790, 11, 98.19), (9790, 13, 100.0), (9790, 15, 100.0), (9790, 17, 100.0), (9790, 19, 100.0), (9790, 21, 100.0), (9790, 23, 100.0), (9790, 25, 100.0)]
@@ -0,0 +1,119 @@
+import time
+from array import array
+
+from flat_rpni import FlatRPNI
+from instrumentation import measure, pta_construction_phase
+from prefix_trie import SampleView
+from rpni_pta import FlatPTA, report_non_deterministic_data
+
+
+class IncrementalRPNI(FlatRPNI):
+    """
+    RPNI for Mealy machines that keeps its prefix tree acceptor (PTA) and the sequence of red-blue decisions between
+    runs. When it is updated with a superset of the previous sample, only the new traces are inserted into the PTA and
+    the previous decisions are replayed: a merge is only checked against the red state it was performed with, as
+    additional data can never make an incompatible merge compatible, and a promotion needs no check at all. From the
+    first decision that the new data contradicts (or that concerns a different blue state) on, merges are searched
+    as in RPNI. The partition is not kept between updates: every update starts from the unmerged PTA and performs all
+    merges again, so a sweep over n nested samples still costs n merge sequences, of which only the replayed part is
+    cheaper than in RPNI.
+
+    The learned model is the same as the one of aalpy's run_RPNI for the given data, provided that the samples of the
+    previous update come first in the data (as for nested samples). Data has to be prefix-closed.
+
+    Data can also be given as a SampleView. Its samples are inserted directly from the trie nodes; if the previous
+    update was a view on the same trie, the samples are compared by node.
+    """
+
+    def __init__(self, print_info=False) -> None:
+        # the PTA is built by update() instead of from data given here
+        self.print_info = print_info
+        self.pta = FlatPTA()
+        self.merge_checks = 0
+
+        self.samples = dict()
+        # trie of the SampleView of the previous update, its sample nodes and the PTA node of every trie node
+        self.view_trie = None
+        self.view_nodes = range(0)
+        self.view_pta_nodes = array('l', [0])
+
+        # (blue node, red node it was merged with or None if it was promoted) for every RPNI iteration
+        self.decisions = []
+        self._previous_decisions = []
+        self._in_sync = False
+
+    def update(self, data, input_completeness=None, recorder=None):
+        """
+        Learns a Mealy machine from data, a list of (input sequence, output) pairs or a SampleView. If data does not
+        contain every sample of the previous update, learning starts from scratch. PTA construction and merging are
+        recorded as phases if a PhaseRecorder is given.
+
+        Returns:
+
+            learned model, or None if data is non-deterministic
+
+        """
+        pta_construction_start = time.time()
+        is_view = isinstance(data, SampleView)
+        if is_view:
+            if data.trie is not self.view_trie or not self._contains(data.nodes, self.view_nodes):
+                self.__init__(self.print_info)
+                self.view_trie = data.trie
+            new_nodes = self._difference(data.nodes, self.view_nodes)
+            with measure(recorder, pta_construction_phase):
+                deterministic = self.pta.insert_nodes(data.trie, new_nodes, self.view_pta_nodes)
+        else:
+            samples = {(tuple(seq), label): None for seq, label in data}
+            if self.view_trie is not None or any(sample not in samples for sample in self.samples):
+                self.__init__(self.print_info)
+
+            new_samples = [sample for sample in samples if sample not in self.samples]
+            with measure(recorder, pta_construction_phase):
+                deterministic = self.pta.insert(new_samples)
+        if not deterministic:
+            report_non_deterministic_data()
+            self.__init__(self.print_info)
+            return None
+        self.pta.check_prefix_closed(type(self).__name__)
+        if is_view:
+            self.view_nodes = data.nodes
+        else:
+            self.samples.update(dict.fromkeys(new_samples))
+
+        if self.print_info:
+            print(f'PTA Construction Time: {round(time.time() - pta_construction_start, 2)}')
+
+        return self._learn(input_completeness, recorder)
+
+    @staticmethod
+    def _contains(nodes, previous_nodes):
+        if isinstance(nodes, range) and isinstance(previous_nodes, range) and previous_nodes.step == nodes.step == 1:
+            return not previous_nodes or nodes.start <= previous_nodes.start and previous_nodes.stop <= nodes.stop
+        node_set = set(nodes)
+        return all(node in node_set for node in previous_nodes)
+
+    @staticmethod
+    def _difference(nodes, previous_nodes):
+        if isinstance(nodes, range) and isinstance(previous_nodes, range) and nodes.start == previous_nodes.start:
+            return range(max(previous_nodes.stop, nodes.start), nodes.stop)
+        previous_node_set = set(previous_nodes)
+        return [node for node in nodes if node not in previous_node_set]
+
+    def _run(self):
+        self._previous_decisions, self.decisions = self.decisions, []
+        self._in_sync = True
+        return super()._run()
+
+    def _candidates(self, blue_node, red):
+        previous_decisions, iteration = self._previous_decisions, len(self.decisions)
+        if self._in_sync and iteration < len(previous_decisions) and previous_decisions[iteration][0] == blue_node:
+            previous_red = previous_decisions[iteration][1]
+            # red states before the previously merged one were incompatible and still are
+            return red[red.index(previous_red):] if previous_red is not None else []
+        self._in_sync = False
+        return red
+
+    def _decided(self, blue_node, red_node):
+        iteration = len(self.decisions)
+        self._in_sync = self._in_sync and self._previous_decisions[iteration] == (blue_node, red_node)
+        self.decisions.append((blue_node, red_node))
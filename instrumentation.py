@@ -0,0 +1,117 @@
+import cProfile
+import os
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+data_generation_phase = 'data generation'
+pta_construction_phase = 'pta construction'
+merging_phase = 'merging'
+l_star_learning_phase = 'l* learning'
+equivalence_checking_phase = 'equivalence checking'
+conformance_evaluation_phase = 'conformance evaluation'
+# equivalence checking are the counterexample searches of the equivalence oracle of L*, the check of the learned model
+# against the true model belongs to the conformance evaluation
+
+l_star_phases = [l_star_learning_phase, equivalence_checking_phase, conformance_evaluation_phase]
+rpni_phases = [data_generation_phase, pta_construction_phase, merging_phase, conformance_evaluation_phase]
+cached_l_star_phases = [data_generation_phase, l_star_learning_phase, equivalence_checking_phase,
+                        conformance_evaluation_phase]
+
+# metric -> column label
+phase_metrics = {'wall_time': 'wall time (s)', 'cpu_time': 'CPU time (s)', 'peak_memory_kib': 'peak memory (KiB)'}
+
+
+class PhaseRecorder:
+    """
+    Records wall time and CPU time of named phases and, if trace_memory is set, their tracemalloc peak (relative to
+    the memory in use when the phase started). Times of a phase that is entered several times are summed up, its peak
+    memory is the maximum. A phase entered within another phase is excluded from the times of the outer phase, but
+    not from its peak memory.
+
+    tracemalloc slows allocations down several times, so the times of a recorder that traces memory are not
+    comparable to the ones of a recorder that does not; time and memory are best recorded in separate runs.
+    """
+
+    def __init__(self, trace_memory=False) -> None:
+        self.trace_memory = trace_memory
+        self.phases = dict()
+        # wall time and CPU time of the nested phases and peak memory so far of every phase that is currently entered
+        self._frames = []
+
+    @contextmanager
+    def phase(self, name):
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            if self._frames:
+                self._frames[-1][2] = max(self._frames[-1][2], tracemalloc.get_traced_memory()[1])
+            start_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        frame = [0, 0, 0]
+        self._frames.append(frame)
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall_time, cpu_time = time.perf_counter() - start_wall, time.process_time() - start_cpu
+            self._frames.pop()
+            metrics = self.phases.setdefault(name, dict.fromkeys(phase_metrics, 0))
+            metrics['wall_time'] += wall_time - frame[0]
+            metrics['cpu_time'] += cpu_time - frame[1]
+            if self._frames:
+                self._frames[-1][0] += wall_time
+                self._frames[-1][1] += cpu_time
+            if self.trace_memory:
+                peak_memory = max(frame[2], tracemalloc.get_traced_memory()[1])
+                metrics['peak_memory_kib'] = max(metrics['peak_memory_kib'], (peak_memory - start_memory) / 1024)
+                if self._frames:
+                    self._frames[-1][2] = max(self._frames[-1][2], peak_memory)
+                if started_tracing:
+                    tracemalloc.stop()
+
+
+def measure(recorder, phase):
+    """
+    Context manager recording the phase if a recorder is given, and doing nothing otherwise.
+    """
+    return recorder.phase(phase) if recorder is not None else nullcontext()
+
+
+@contextmanager
+def profiled(profile_dir, run_name):
+    """
+    Profiles the enclosed code with cProfile and dumps the statistics to <profile_dir>/<run_name>.prof. Does nothing
+    if profile_dir is None.
+    """
+    if profile_dir is None:
+        yield
+        return
+
+    os.makedirs(profile_dir, exist_ok=True)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(os.path.join(profile_dir, re.sub(r'[^\w.-]+', '_', run_name) + '.prof'))
+
+
+def phase_attr(phase, metric):
+    return re.sub(r'\W+', '_', f'{phase.replace("*", " star")} {metric}')
+
+
+def phase_columns(phases):
+    """
+    CSV columns (label -> attribute of the export entry) of the metrics of the given phases.
+    """
+    columns = dict()
+    for phase in phases:
+        for metric, label in phase_metrics.items():
+            columns[f'{phase[0].upper()}{phase[1:]} {label}'] = phase_attr(phase, metric)
+    return columns
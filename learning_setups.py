@@ -1,46 +1,173 @@
-from aalpy.SULs import MealySUL
-from aalpy.learning_algs import run_Lstar, run_RPNI
+import time
 
+from aalpy.learning_algs import run_Lstar
+from aalpy.learning_algs.deterministic_passive.RPNI import RPNI
+
+from compiled_automata import CompiledMealySUL
 from data_classes import RPNIExperiment, CachedLStarExperiment, LStarExperiment
 from data_generation import DataSet, l_star_with_populated_cache
-from model_comparison import compare_learned_models
+from flat_rpni import FlatRPNI
+from instrumentation import measure, l_star_learning_phase, equivalence_checking_phase, \
+    conformance_evaluation_phase, pta_construction_phase, merging_phase
+from model_comparison import compare_learned_models, check_equivalence
+from rpni_pta import complete_model, report_non_deterministic_data
+
+# RPNI implementations of rpni_experiment: aalpy's RPNI or FlatRPNI, which learns the same models
+rpni_engines = ['aalpy', 'flat']
+
 
+def _random_conformance(model, learned_model, test_cases_random, sequential_conformance):
+    """
+    Returns the random conformance, the half width of its confidence interval and the number of evaluated test cases.
+    The conformance is on the scale of the exhaustive evaluation and of the coverage conformance, 100 - ratio of
+    differing test cases, while the half width is in percentage points of conforming test cases, the unit of
+    --max-half-width.
+    """
+    if sequential_conformance is None:
+        return 100 - compare_learned_models(model, learned_model, test_cases_random), 0, len(test_cases_random)
+    estimate = sequential_conformance.estimate(model, learned_model, test_cases_random)
+    return 100 - (100 - estimate.conformance) / 100, estimate.half_width(), estimate.test_cases_used
 
-def l_star_experiment(model, test_cases_coverage, test_cases_random, alphabet, eq_oracle):
-    # L*
-    sul = MealySUL(model)
-    l_star_model, data = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0, return_data=True)
+
+def l_star_experiment(model, test_cases_coverage, test_cases_random, alphabet, eq_oracle, sul=None, recorder=None,
+                      sequential_conformance=None):
+    """
+    If SequentialConformance settings are given, the random conformance is estimated sequentially.
+    """
+    # L*, on a SimulatedDeviceSUL if given
+    sul = sul if sul is not None else CompiledMealySUL(model)
+    start_time = time.time()
+    with measure(recorder, l_star_learning_phase):
+        l_star_model, data = run_Lstar(alphabet, sul, _recorded_oracle(eq_oracle, recorder), 'mealy', print_level=0,
+                                       return_data=True)
+    measured_time = time.time() - start_time
 
     # L* info
-    output_queries = data['queries_learning']
-    steps_output_queries = data['steps_learning']
-    eq_oracle_queries = data['queries_eq_oracle']
-    steps_eq_queries = data['steps_eq_oracle']
+    posed_queries = data['queries_learning'] + data['queries_eq_oracle']
+    posed_steps = data['steps_learning'] + data['steps_eq_oracle']
+    output_queries, steps_output_queries, eq_oracle_queries, steps_eq_queries = _reported_queries(sul, data)
     learning_rounds = data['learning_rounds']
 
-    coverage_diff = compare_learned_models(model, l_star_model, test_cases_coverage)
-    random_diff = compare_learned_models(model, l_star_model, test_cases_random)
+    with measure(recorder, conformance_evaluation_phase):
+        coverage_diff = compare_learned_models(model, l_star_model, test_cases_coverage)
+        conformance_random, random_bound, random_test_cases = \
+            _random_conformance(model, l_star_model, test_cases_random, sequential_conformance)
+        equivalent, _ = check_equivalence(model, l_star_model)
 
     return LStarExperiment(l_star_model.size, output_queries, steps_output_queries, eq_oracle_queries, steps_eq_queries,
-                           learning_rounds, 100 - coverage_diff, 100 - random_diff)
+                           learning_rounds, 100 - coverage_diff, conformance_random, equivalent,
+                           getattr(sul, 'simulated_time', 0), measured_time, _phases(recorder), random_bound,
+                           random_test_cases, posed_queries, posed_steps)
+
+
+def _reported_queries(sul, data):
+    """
+    Membership queries, their steps, equivalence queries and their steps of an L* run: the ones posed by L*, or the ones
+    executed on the system if sul is a PersistentCacheSUL with accounting 'actual'.
+    """
+    if getattr(sul, 'accounting', 'uncached') == 'actual':
+        return tuple(sul.executed_queries)
+    return data['queries_learning'], data['steps_learning'], data['queries_eq_oracle'], data['steps_eq_oracle']
+
+
+def _recorded_oracle(eq_oracle, recorder):
+    # counterexample searches are recorded as equivalence checking, nested in (and excluded from) L* learning
+    if recorder is not None:
+        find_cex = eq_oracle.find_cex
+
+        def recorded_find_cex(hypothesis):
+            with recorder.phase(equivalence_checking_phase):
+                return find_cex(hypothesis)
+
+        eq_oracle.find_cex = recorded_find_cex
+    return eq_oracle
 
 
-def rpni_experiment(data, model, test_cases_coverage, test_cases_random):
-    rpni_model = run_RPNI(data.data, automaton_type='mealy', input_completeness='sink_state', print_info=False)
+def _phases(recorder):
+    return dict(recorder.phases) if recorder is not None else None
 
-    conformance_coverage = 100 - compare_learned_models(model, rpni_model, test_cases_coverage)
-    conformance_random = 100 - compare_learned_models(model, rpni_model, test_cases_random)
+
+def learn_rpni(data, rpni_engine='aalpy', recorder=None, print_info=False):
+    """
+    Learns a Mealy machine from a DataSet with the given RPNI engine (see rpni_engines), completed with sink states.
+    PTA construction and merging are recorded as phases if a PhaseRecorder is given.
+
+    Returns:
+
+        learned model, or None if data is non-deterministic
+
+    """
+    assert rpni_engine in rpni_engines
+    if rpni_engine == 'flat':
+        with measure(recorder, pta_construction_phase):
+            rpni = FlatRPNI(data.view(), print_info)
+        with measure(recorder, merging_phase):
+            return rpni.run(input_completeness='sink_state')
+
+    # run_RPNI, with PTA construction and merging recorded separately
+    with measure(recorder, pta_construction_phase):
+        rpni = RPNI(data.data, 'mealy', print_info=print_info)
+    if rpni.root_node is None:
+        report_non_deterministic_data()
+        return None
+    with measure(recorder, merging_phase):
+        return complete_model(rpni.run_rpni(), 'sink_state', print_info)
+
+
+def rpni_experiment(data, model, test_cases_coverage, test_cases_random, learner=None, device_pool=None,
+                    recorder=None, sequential_conformance=None, rpni_engine='aalpy'):
+    """
+    If an IncrementalRPNI learner is given, it is updated with the data instead of running RPNI from scratch.
+    Otherwise, the model is learned with the given RPNI engine (see rpni_engines).
+    If a DevicePool is given, the time needed to collect the data on its simulated devices is reported.
+    If a PhaseRecorder is given, the phases of the experiment are recorded.
+    If SequentialConformance settings are given, the random conformance is estimated sequentially.
+    """
+    projected_time, measured_time = 0, 0
+    if device_pool is not None:
+        projected_time, measured_time = device_pool.collection_time(data.sequences)
+
+    if learner is not None:
+        rpni_model = learner.update(data.view(), input_completeness='sink_state', recorder=recorder)
+    else:
+        rpni_model = learn_rpni(data, rpni_engine, recorder)
+
+    with measure(recorder, conformance_evaluation_phase):
+        conformance_coverage = 100 - compare_learned_models(model, rpni_model, test_cases_coverage)
+        conformance_random, random_bound, random_test_cases = \
+            _random_conformance(model, rpni_model, test_cases_random, sequential_conformance)
+        equivalent, counterexample = check_equivalence(model, rpni_model)
 
     return RPNIExperiment(rpni_model.size, conformance_coverage, conformance_random, data.size, data.average_len(),
-                          conformance_coverage == 100)
+                          equivalent, counterexample, projected_time, measured_time, _phases(recorder), random_bound,
+                          random_test_cases)
+
 
+def l_star_with_initial_cache(cached_data: DataSet, model, eq_oracle, test_cases_coverage, sul=None, device_pool=None,
+                              recorder=None):
+    """
+    Times are the sum of collecting the cached data (if a DevicePool is given) and learning on sul. If sul is a
+    PersistentCacheSUL with accounting 'actual', the queries executed on the system are reported as the queries needed
+    to fill the holes of the cache.
+    """
+    projected_time, measured_time = 0, 0
+    if device_pool is not None:
+        projected_time, measured_time = device_pool.collection_time(cached_data.sequences)
 
-def l_star_with_initial_cache(cached_data: DataSet, model, eq_oracle, test_cases_coverage):
-    learned_model, queries_to_fill_holes, cache_hits, learning_rounds = l_star_with_populated_cache(model,
-                                                                                                    cached_data.data,
-                                                                                                    eq_oracle)
+    start_time = time.time()
+    with measure(recorder, l_star_learning_phase):
+        learned_model, queries_to_fill_holes, cache_hits, learning_rounds, telemetry = \
+            l_star_with_populated_cache(model, cached_data.view(), _recorded_oracle(eq_oracle, recorder), sul)
+    measured_time += time.time() - start_time
+    projected_time += getattr(sul, 'simulated_time', 0)
+    if getattr(sul, 'accounting', 'uncached') == 'actual':
+        queries_to_fill_holes = sul.executed_queries[0] + sul.executed_queries[2]
 
-    conformance_coverage = 100 - compare_learned_models(model, learned_model, test_cases_coverage)
+    with measure(recorder, conformance_evaluation_phase):
+        conformance_coverage = 100 - compare_learned_models(model, learned_model, test_cases_coverage)
+        equivalent, _ = check_equivalence(model, learned_model)
 
     return CachedLStarExperiment(conformance_coverage, cached_data.size, queries_to_fill_holes, cache_hits,
-                                 learning_rounds)
+                                 learning_rounds, equivalent, telemetry.nodes, telemetry.memory_bytes / 1024,
+                                 telemetry.membership_hit_ratio(), telemetry.equivalence_hit_ratio(),
+                                 telemetry.longest_cached_prefix, projected_time, measured_time, _phases(recorder))
@@ -1,153 +1,181 @@
+import argparse
+import random
 import sys
+from datetime import datetime
+
+# the experiment runner and the results store are imported by the subcommands; building the parser only imports
+# learning_setups, which defines the RPNI engines
+
+command_names = ['compare', 'lstar', 'rpni', 'cached-lstar', 'heatmap']
+
+# arguments that determine the results of a run, checkpointed in the results store when the run starts
+run_settings = ['benchmark', 'models', 'experiments', 'repeats', 'num_tests', 'seed', 'devices', 'time_scale',
+                'instrument', 'trace_memory', 'sequential_conformance', 'confidence', 'max_half_width', 'rpni_engine',
+                'cache_accounting']
+
+
+def _experiment_options():
+    from learning_setups import rpni_engines
+    from query_cache import cache_accountings
+
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument('benchmark', nargs='?', default='BLE', help="'MQTT' or 'BLE'")
+    options.add_argument('--models', nargs='+', default=None, metavar='MODEL',
+                         help='only learn the models of the benchmark matching these names or glob patterns')
+    options.add_argument('--repeats', type=int, default=5, help='repetitions of every experiment')
+    options.add_argument('--num-tests', type=int, default=10000,
+                         help='number of test cases of the conformance test suites')
+    options.add_argument('--output', default=None, metavar='PREFIX',
+                         help='prefix of the exported summary csv files (default: the benchmark name)')
+    options.add_argument('--no-csv', action='store_true', help='do not export the summary csv files')
+    options.add_argument('--verbose', type=int, choices=[0, 1, 2], default=1,
+                         help='0: no output, 1: summaries, 2: summaries and debug output')
+    options.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    options.add_argument('--seed', type=int, default=None, help='base seed of all experiment units')
+    options.add_argument('--devices', type=int, default=1,
+                         help='number of simulated devices on which passive learning data is collected')
+    options.add_argument('--time-scale', type=float, default=0,
+                         help='simulated devices wait time-scale times their latency (1: real time, 0: no waiting)')
+    options.add_argument('--instrument', action='store_true',
+                         help='record wall time and CPU time of every experiment phase')
+    options.add_argument('--trace-memory', action='store_true',
+                         help='with --instrument, also record the peak memory of every phase with tracemalloc, which '
+                              'slows allocation-heavy phases down several times; measure times in a separate run')
+    options.add_argument('--profile-dir', default=None, help='dump a cProfile profile of every experiment unit here')
+    options.add_argument('--sequential-conformance', action='store_true',
+                         help='estimate the random conformance from a randomized prefix of the test suite, stopping '
+                              'once its confidence interval is tight enough')
+    options.add_argument('--confidence', type=float, default=0.95, help='confidence of --sequential-conformance')
+    options.add_argument('--max-half-width', type=float, default=1.,
+                         help='half width (percentage points of conforming test cases) at which '
+                              '--sequential-conformance stops; the reported bound is in the same unit')
+    options.add_argument('--rpni-engine', choices=rpni_engines, default='aalpy',
+                         help="RPNI implementation of the passive experiments: 'aalpy' or 'flat', which learns the "
+                              "same models faster")
+    options.add_argument('--query-cache', default=None, metavar='DATABASE',
+                         help='SQLite database in which the queries of the active experiments are cached across runs')
+    options.add_argument('--cache-accounting', choices=cache_accountings, default='uncached',
+                         help="with --query-cache, 'uncached' reports queries and simulated times as if nothing was "
+                              "cached, 'actual' only the queries executed on the system and their simulated time")
+    options.add_argument('--results-dir', default='results',
+                         help='directory of the results store to which every experiment record is appended')
+    options.add_argument('--run-id', default=None,
+                         help='name of the run in the results store (default: benchmark and start time)')
+    options.add_argument('--resume', metavar='RUN_ID', default=None,
+                         help='resume an interrupted run of the results store with the settings it was started with '
+                              '(including its experiments and models), skipping all completed experiment units')
+    return options
+
+
+def _parser():
+    parser = argparse.ArgumentParser(description='Active and passive learning experiments on the BLE and MQTT '
+                                                 'benchmarks. Without a subcommand, the arguments are passed to '
+                                                 'compare.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    options = _experiment_options()
+    subparsers.add_parser('compare', parents=[options],
+                          help='compare L*, RPNI on random and L* data and L* with a populated cache')
+    subparsers.add_parser('lstar', parents=[options], help='L* experiments')
+    subparsers.add_parser('rpni', parents=[options],
+                          help='RPNI experiments (the L* experiments are executed as well, as they determine the '
+                               'sample sizes)')
+    subparsers.add_parser('cached-lstar', parents=[options],
+                          help='L* with a populated cache (the L* experiments are executed as well)')
+    subparsers.add_parser('heatmap', add_help=False,
+                          help='conformance heatmap of RPNI, see main.py heatmap --help')
+    return parser, subparsers
+
+
+def run_experiments(parser, args):
+    from data_classes import load_dot_files
+    from experiment_runner import ExperimentRunner, experiment_types
+    from model_comparison import SequentialConformance, create_test_cases
+    from results_store import ResultsStore, export_summaries
+    from simulated_device import device_profiles
+    from suite_cache import SuiteCache
+
+    args.experiments = experiment_types if args.command == 'compare' else [args.command]
+
+    # raw records of all experiments, the summaries are derived from them
+    if args.resume is not None:
+        store = ResultsStore(args.results_dir, args.resume)
+        settings = store.settings()
+        if settings is None:
+            parser.error(f'run {args.resume} was not started in {args.results_dir}')
+        # runs started before a setting existed used its default
+        defaults = {'experiments': experiment_types, 'trace_memory': True}
+        for name in run_settings:
+            setattr(args, name, settings.get(name, defaults.get(name, parser.get_default(name))))
+    else:
+        store = ResultsStore(args.results_dir, args.run_id or f'{args.benchmark}-{datetime.now():%Y%m%d-%H%M%S}')
+        if store.settings() is not None:
+            parser.error(f'run {store.run_id} exists in {args.results_dir}, use --resume to continue it')
+        # all random numbers of the run are derived from the base seed
+        args.seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+
+    # load the automata of the benchmark
+    benchmark = args.benchmark  # 'MQTT' or 'BLE'
+    benchmark_models = load_dot_files(benchmark, args.models)
+    if not benchmark_models:
+        parser.error(f'no model of benchmark {benchmark} matches {args.models}')
+
+    # the settings are only stored once all arguments are valid, so that an invalid call leaves no run behind
+    if args.resume is None:
+        store.start({name: getattr(args, name) for name in run_settings})
 
-from csv_export import *
-from data_classes import *
-from data_generation import *
-from learning_setups import *
-from model_comparison import *
+    # levels on which output is printed
+    # 0: no output is printed
+    # 1: data summary is printed
+    # 2: data summary + debug output
+    verbose_level = args.verbose
+    if verbose_level >= 1:
+        print(f'Results store: {store.path}')
+    if verbose_level == 2:
+        print(f'Seed: {args.seed}')
 
+    # generate test suite for conformance testing after learning
+    suite_cache = SuiteCache()
+    test_cases_coverage = create_test_cases(benchmark_models, args.num_tests, 'coverage', seed=args.seed,
+                                            cache=suite_cache)
+    test_cases_random = create_test_cases(benchmark_models, args.num_tests, 'random', seed=args.seed,
+                                          cache=suite_cache)
 
+    # parameter for equivalence oracle
+    walks_per_state = 25
+    walk_len = 30
 
-if __name__ == "__main__":
+    sequential_conformance = SequentialConformance(args.confidence, args.max_half_width) \
+        if args.sequential_conformance else None
 
-    args = sys.argv[1:]
+    runner = ExperimentRunner(benchmark_models, test_cases_coverage, test_cases_random, repeats=args.repeats,
+                              workers=args.workers, seed=args.seed, walks_per_state=walks_per_state, walk_len=walk_len,
+                              verbose=verbose_level == 2, latencies=device_profiles.get(benchmark),
+                              devices=args.devices, time_scale=args.time_scale, instrument=args.instrument,
+                              profile_dir=args.profile_dir, sequential_conformance=sequential_conformance,
+                              store=store, rpni_engine=args.rpni_engine, query_cache=args.query_cache,
+                              experiments=args.experiments, trace_memory=args.trace_memory,
+                              cache_accounting=args.cache_accounting)
+    runner.run()
 
-    # load all automata from benchmark
-    benchmark = args[0] if len(args) == 1 else "BLE"  # 'MQTT' or 'BLE'
-    benchmark_models = load_dot_files(benchmark)
+    export_summaries(store, args.output or benchmark, [model_name for model_name, _ in benchmark_models],
+                     verbose=verbose_level >= 1, export_csv=not args.no_csv, instrumented=args.instrument)
+    return 0
 
-    # generate test suite for conformance testing after learning
-    num_tests = 10000
-    test_cases_coverage = create_test_cases(benchmark_models, num_tests, 'coverage')
-    test_cases_random = create_test_cases(benchmark_models, num_tests, 'random')
 
-    # number of repetition of each learning algorithm
-    repeats_per_experiment = 5  # 5
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # main.py [benchmark] [options] of earlier versions runs the comparison
+    if not argv or (argv[0] not in command_names and argv[0] not in ('-h', '--help')):
+        argv = ['compare'] + argv
 
-    # levels on which output is printed
-    # 0: no output is printed
-    # 1: data summary is printed
-    # 2: data summary + debug output
-    verbose_level = 1
-
-    # export csv files that contain the results of the performed evaluation
-    csv = True
-    l_star_data_export = DataExporter(LStarExportEntry.pretty_printed_attr())
-    rpni_data_export = RPNIDataExporter(RPNIExportEntry.pretty_printed_attr())
-    cached_l_star_data_export = DataExporter(CachedLStarExportEntry.pretty_printed_attr())
-
-    # rpni_model_l_star_str = "l* data"
-    rpni_model_random_l_star_length_str = "random |l* data|"
-    rpni_model_random_large_set_str = "random 2*|l* data|"
-    rpni_model_random_long_traces_str = "random long traces"
-    rpni_model_minimized_char_set_str = "l* data (minimized)"
-    # rpni_model_random_good_enough_str = "random corr"
+    if argv[0] == 'heatmap':
+        from heatmap_experiment import main as heatmap_main
+        return heatmap_main(argv[1:], prog='main.py heatmap')
 
-    rpni_data = {
-        # rpni_model_l_star_str: data_l_star,
-        rpni_model_random_l_star_length_str: None,
-        rpni_model_random_large_set_str: None,
-        rpni_model_random_long_traces_str: None,
-        # rpni_model_minimized_char_set_str: data_minimized_char_set,
-        # rpni_model_random_good_enough_str: data_random_good_enough
-    }
-
-    rpni_data_names = rpni_data.keys()
-
-    for model_name, model in benchmark_models:
-
-        l_star_experiment_data = defaultdict(list)
-        rpni_experiment_data = defaultdict(defaultdict)
-        cached_l_star_experiment_data = defaultdict(list)
-
-        # parameter for equivalence oracle
-        walks_per_state = 25
-        walk_len = 30
-
-        sul = MealySUL(model)
-        alphabet = model.get_input_alphabet()
-
-        rpni_data_export.add_model(model_name)
-
-        for _ in range(repeats_per_experiment):
-            eq_oracle = StatePrefixEqOracle(alphabet, sul, walks_per_state=walks_per_state, walk_len=walk_len)
-            l_star_res = l_star_experiment(model, test_cases_coverage[model_name], test_cases_random[model_name],
-                                           alphabet, eq_oracle)
-            l_star_experiment_data[model_name].append(l_star_res)
-
-        avg_query_steps = data_stats("average_trace_len", l_star_experiment_data[model_name])[0]
-        max_sequence_length = round((avg_query_steps - 0.5) * 2)
-
-        learning_queries = round(data_stats("sum_queries", l_star_experiment_data[model_name])[0])
-
-        data_l_star = data_from_computed_e_set(model, include_extended_s_set=True, verbose=verbose_level == 2)
-
-        data_minimized_char_set = minimized_char_set_data(model, include_extended_s_set=True,
-                                                          verbose=verbose_level == 2)
-
-        model_size = model.size
-
-        rpni_experiment_data[model_name] = defaultdict(list)
-
-        for _ in range(repeats_per_experiment):
-            # data generation:
-
-            # random |l* data|
-            data_random_l_star_length = generate_random_data(model, num_sequences=learning_queries, min_sequence_len=1,
-                                                             max_sequence_len=max_sequence_length,
-                                                             verbose=verbose_level == 2)
-
-            # random 2*|l* data|
-            data_random_large_set = generate_random_data(model, num_sequences=(learning_queries * 2),
-                                                         min_sequence_len=1, max_sequence_len=max_sequence_length,
-                                                         verbose=verbose_level == 2)
-
-            # random long traces
-            data_random_long_traces = generate_random_data(model, num_sequences=learning_queries,
-                                                           min_sequence_len=model_size,
-                                                           max_sequence_len=(model_size * 2),
-                                                           verbose=verbose_level == 2)
-
-            # good enough data (randomly generated data that learns correctly) data_random_good_enough =
-            # generate_random_data(model, num_sequences= learning_queries * 1, min_sequence_len=model_size,
-            # max_sequence_len=max(10,model_size)  + model_size, verbose=verbose)
-
-            rpni_data = {
-                # rpni_model_l_star_str: data_l_star,
-                rpni_model_random_l_star_length_str: data_random_l_star_length,
-                rpni_model_random_large_set_str: data_random_large_set,
-                rpni_model_random_long_traces_str: data_random_long_traces,
-                # rpni_model_minimized_char_set_str: data_minimized_char_set,
-                # rpni_model_random_good_enough_str: data_random_good_enough
-            }
-
-            for data_name, data in rpni_data.items():
-                rpni_experiment_data[model_name][data_name].append(
-                    rpni_experiment(data, model, test_cases_coverage[model_name], test_cases_random[model_name]))
-
-            eq_oracle = StatePrefixEqOracle(alphabet, sul, walks_per_state=walks_per_state, walk_len=walk_len)
-            cached_l_star_experiment = l_star_with_initial_cache(data_random_l_star_length, model, eq_oracle,
-                                                                 test_cases_coverage[model_name])
-            # L* cached with random samples
-            cached_l_star_experiment_data[model_name].append(cached_l_star_experiment)
-
-        rpni_experiment_data[model_name][rpni_model_minimized_char_set_str].append(
-            rpni_experiment(data_minimized_char_set, model, test_cases_coverage[model_name],
-                            test_cases_random[model_name]))
-
-        print(f'\n\n------------------{model_name}------------------')
-        l_star_data_export.add_entry(model_name,
-                                     l_star_summary(l_star_experiment_data[model_name], verbose=verbose_level >= 1))
-
-        rpni_data_export.add_entry(model_name, rpni_summary(rpni_experiment_data[model_name], rpni_data_names,
-                                                            rpni_model_minimized_char_set_str,
-                                                            verbose=verbose_level >= 1))
+    parser, subparsers = _parser()
+    args = parser.parse_args(argv)
+    return run_experiments(subparsers.choices[args.command], args)
 
-        cached_l_star_data_export.add_entry(model_name, cached_l_star_summary(cached_l_star_experiment_data[model_name],
-                                                                              verbose=verbose_level >= 1))
 
-    if csv:
-        l_star_data_export.export_csv(f'{benchmark}_l_star_data')
-        rpni_experiments = [*rpni_data] + [rpni_model_minimized_char_set_str]
-        rpni_data_export.export_csv(f'{benchmark}_rpni_data', rpni_experiments)
-        cached_l_star_data_export.export_csv(f'{benchmark}_cached_l_star_data')
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+from collections import OrderedDict, deque
+
+from aalpy.automata import MealyMachine
+
+from compiled_automata import compile_mealy, model_fingerprint
+
+
+class ModelAnalysis:
+    """
+    State cover and characterization set of a Mealy machine, computed once on its compiled tables.
+
+    The state cover is computed with a single breadth-first search and the characterization set from the levels of a
+    Moore-style partition refinement, from which a shortest distinguishing sequence of any two states is read off
+    without a search on state pairs. The refinement takes up to n rounds over all transitions, O(n^2 |I|) in the
+    worst case for n states and inputs I, and not O(n log n |I|) like Hopcroft's algorithm, whose final partition
+    lacks the levels that give the shortest distinguishing sequences. aalpy's get_shortest_path and
+    compute_characterization_set (with the default arguments) search anew for every state or pair of states. The state
+    cover is the same as theirs; the characterization set contains the same sequences, but in another order, so
+    callers that depend on the order sort it.
+    """
+
+    def __init__(self, model: MealyMachine) -> None:
+        self.model = model
+        self.compiled = compile_mealy(model)
+        self._state_cover = None
+        self._levels = None
+        self._characterization_set = None
+
+    def state_cover(self):
+        """
+        Shortest input sequence reaching every state, in the order of model.states. Ties are broken in the order of
+        the transitions of the states, as in MealyMachine.get_shortest_path.
+        """
+        if self._state_cover is None:
+            states = self.model.states
+            state_index = {id(state): i for i, state in enumerate(states)}
+            cover = [None] * len(states)
+            initial = state_index[id(self.model.initial_state)]
+            cover[initial] = ()
+            queue = deque([initial])
+            while queue:
+                s = queue.popleft()
+                for i, target in states[s].transitions.items():
+                    t = state_index[id(target)]
+                    if cover[t] is None:
+                        cover[t] = cover[s] + (i,)
+                        queue.append(t)
+            # unreachable states get the empty sequence, like in get_shortest_path
+            self._state_cover = [prefix if prefix is not None else () for prefix in cover]
+        return self._state_cover
+
+    def _refinement_levels(self):
+        """
+        Block of every state in the partitions of the Moore-style refinement: level k groups states that produce the
+        same outputs on all sequences of length at most k, so two states are first separated on the level that is the
+        length of their shortest distinguishing sequences. Undefined transitions lead to block -1 on every level.
+        """
+        if self._levels is None:
+            transitions = self.compiled.transitions.tolist()
+            output_fun = self.compiled.output_fun.tolist()
+
+            blocks = dict()
+            levels = [[0] * len(transitions), [blocks.setdefault(tuple(row), len(blocks)) for row in output_fun]]
+            while len(set(levels[-1])) != len(set(levels[-2])):
+                previous, blocks = levels[-1], dict()
+                levels.append([blocks.setdefault((previous[s], tuple(previous[t] if t >= 0 else -1 for t in row)),
+                                                 len(blocks)) for s, row in enumerate(transitions)])
+            self._levels = levels
+        return self._levels
+
+    def distinguishing_sequence(self, state_1, state_2):
+        """
+        Shortest input sequence on which the outputs of two states (indices into model.states) differ, the first one
+        in the order of the input alphabet. None if the states are equivalent.
+        """
+        levels = self._refinement_levels()
+        length = next((k for k, level in enumerate(levels) if level[state_1] != level[state_2]), None)
+        if length is None:
+            return None
+
+        transitions, output_fun = self.compiled.transitions, self.compiled.output_fun
+        inputs = self.compiled.inputs.symbols
+        sequence = []
+        for k in range(length, 0, -1):
+            for i in range(len(inputs)):
+                if k == 1:
+                    if output_fun[state_1, i] != output_fun[state_2, i]:
+                        break
+                else:
+                    # -1 marks an undefined transition and must not index the level
+                    t_1, t_2 = transitions[state_1, i], transitions[state_2, i]
+                    if (levels[k - 1][t_1] if t_1 >= 0 else -1) != (levels[k - 1][t_2] if t_2 >= 0 else -1):
+                        break
+            sequence.append(inputs[i])
+            state_1, state_2 = transitions[state_1, i], transitions[state_2, i]
+        return tuple(sequence)
+
+    def _output_sequence(self, state, sequence):
+        transitions, output_fun, input_index = self.compiled.transitions, self.compiled.output_fun, \
+            self.compiled.inputs.index
+        outputs = []
+        for i in sequence:
+            if state < 0:
+                # after an undefined transition, all outputs are undefined
+                outputs.append(-1)
+                continue
+            j = input_index[i]
+            outputs.append(output_fun[state, j])
+            state = transitions[state, j]
+        return tuple(outputs)
+
+    def characterization_set(self):
+        """
+        Suffix-closed characterization set, built like MealyMachine.compute_characterization_set: the first two
+        states of the first block that is not yet split are distinguished, and every suffix of their distinguishing
+        sequence splits all blocks. Contains the same sequences as compute_characterization_set, in another order.
+        Only works for minimal machines.
+        """
+        if self._characterization_set is None:
+            blocks = [list(range(len(self.model.states)))]
+            char_set = []
+            while True:
+                block_to_split = next((block for block in blocks if len(block) > 1), None)
+                if block_to_split is None:
+                    break
+
+                dist_seq = self.distinguishing_sequence(block_to_split[0], block_to_split[1])
+                if dist_seq is None:
+                    raise ValueError('Distinguishing sequence could not be computed (non-minimal machine).')
+
+                for k in range(len(dist_seq) - 1, -1, -1):
+                    suffix = dist_seq[k:]
+                    if suffix in char_set:
+                        continue
+                    char_set.append(suffix)
+                    new_blocks = []
+                    for block in blocks:
+                        split = dict()
+                        for state in block:
+                            split.setdefault(self._output_sequence(state, suffix), []).append(state)
+                        new_blocks.extend(split.values())
+                    blocks = new_blocks
+            self._characterization_set = char_set
+        return list(self._characterization_set)
+
+
+# number of analyses kept by model_analysis
+max_cached_analyses = 64
+
+# fingerprint -> ModelAnalysis of structurally equal models, least recently used first
+_analyses = OrderedDict()
+
+
+def model_analysis(model):
+    """
+    Returns the ModelAnalysis of a model, shared by all structurally equal models (see model_fingerprint). Only the
+    max_cached_analyses most recently used analyses are kept, as every learning run analyses new hypotheses.
+    """
+    key = model_fingerprint(model)
+    analysis = _analyses.get(key)
+    if analysis is None:
+        analysis = _analyses[key] = ModelAnalysis(model)
+        if len(_analyses) > max_cached_analyses:
+            _analyses.popitem(last=False)
+    else:
+        _analyses.move_to_end(key)
+    return analysis
@@ -0,0 +1,93 @@
+import json
+import os
+from fnmatch import fnmatch
+from hashlib import sha256
+
+from aalpy.automata import MealyMachine, MealyState
+from aalpy.utils import load_automaton_from_file
+
+
+def compact_model(model):
+    """
+    Compact, JSON-serializable representation of a Mealy machine that keeps the order of states and transitions.
+    """
+    state_index = {id(state): i for i, state in enumerate(model.states)}
+    inputs, outputs = dict(), dict()
+    transitions = []
+    for state in model.states:
+        transitions.append([(inputs.setdefault(i, len(inputs)), outputs.setdefault(state.output_fun[i], len(outputs)),
+                             state_index[id(target)]) for i, target in state.transitions.items()])
+
+    return {'states': [state.state_id for state in model.states],
+            'initial_state': state_index[id(model.initial_state)],
+            'inputs': list(inputs), 'outputs': list(outputs), 'transitions': transitions}
+
+
+def build_model(compact):
+    states = [MealyState(state_id) for state_id in compact['states']]
+    inputs, outputs = compact['inputs'], compact['outputs']
+    for state, transitions in zip(states, compact['transitions']):
+        for i, o, target in transitions:
+            state.transitions[inputs[i]] = states[target]
+            state.output_fun[inputs[i]] = outputs[o]
+    return MealyMachine(states[compact['initial_state']], states)
+
+
+class ModelCache:
+    """
+    Cache of parsed .dot files. An entry stores the compact model together with the modification time and content
+    hash of its file. Entries with a matching modification time are used directly, otherwise the file is hashed and
+    only parsed again if its content changed.
+    """
+
+    def __init__(self, directory='.model_cache') -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_path(self, path):
+        return os.path.join(self.directory, sha256(os.path.abspath(path).encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, path):
+        entry_path = self._entry_path(path)
+        mtime = os.stat(path).st_mtime_ns
+
+        entry = None
+        if os.path.exists(entry_path):
+            with open(entry_path, encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry['mtime'] == mtime:
+                return build_model(entry['model'])
+
+        with open(path, 'rb') as f:
+            content_hash = sha256(f.read()).hexdigest()
+
+        if entry is not None and entry['hash'] == content_hash:
+            entry['mtime'] = mtime
+            model = build_model(entry['model'])
+        else:
+            model = load_automaton_from_file(path, automaton_type='mealy')
+            entry = {'mtime': mtime, 'hash': content_hash, 'model': compact_model(model)}
+
+        tmp_path = f'{entry_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+        return model
+
+
+def iter_dot_files(benchmark, models=None, cache=None):
+    """
+    Lazily yields (model_name, model) for the .dot files of a benchmark. A model is only loaded once the iterator
+    reaches it. If given, models is a list of model names or glob patterns and only matching models are loaded.
+    """
+    for dot_file in listdir_dot_files(benchmark):
+        model_name = dot_file[:-4]
+        if models is not None and not any(fnmatch(model_name, pattern) for pattern in models):
+            continue
+        path = f'./automata/{benchmark}/{dot_file}'
+        model = cache.load(path) if cache is not None else load_automaton_from_file(path, automaton_type='mealy')
+        yield model_name, model
+
+
+def listdir_dot_files(benchmark):
+    return [dot_file for dot_file in os.listdir(f'./automata/{benchmark}') if dot_file[-4:] == ".dot"]
@@ -1,4 +1,9 @@
-from math import ceil
+import random
+from collections import deque
+from math import ceil, sqrt
+from statistics import NormalDist
+
+import numpy as np
 
 from aalpy.SULs import MealySUL
 from aalpy.learning_algs import run_Lstar, run_RPNI
@@ -6,11 +11,23 @@ from aalpy.oracles import StatePrefixEqOracle, RandomWordEqOracle
 from aalpy.utils import generate_test_cases
 from aalpy.automata import MealyMachine
 
+from compiled_automata import EncodedTestSuite, SymbolTable, compile_mealy
 from data_generation import generate_random_data
+from model_analysis import model_analysis
+from suite_cache import suite_key
+
 
+def compare_learned_models(model_1, model_2, test_cases, vectorized=True, return_divergence=False):
+    """
+    Returns the ratio of test cases on which the output sequences of both models differ. If return_divergence is set,
+    the index of the first differing output of every test case (-1 if the outputs are equal) is returned as well.
+    The vectorized mode evaluates the whole test suite as one batch on the compiled models.
+    """
+    if vectorized:
+        return batch_compare_learned_models(model_1, model_2, test_cases, return_divergence)
 
-def compare_learned_models(model_1, model_2, test_cases):
     diff = 0
+    divergence = []
 
     for test_case in test_cases:
         o_1 = model_1.compute_output_seq(model_1.initial_state, test_case)
@@ -21,24 +38,220 @@ def compare_learned_models(model_1, model_2, test_cases):
             # print(o_1)
             # print(o_2)
             diff += 1
+            divergence.append(next(k for k, (a, b) in enumerate(zip(o_1, o_2)) if a != b))
+        else:
+            divergence.append(-1)
 
+    if return_divergence:
+        return diff / len(test_cases), divergence
     return diff / len(test_cases)
 
 
-def create_test_cases(experiment_list, num_test_cases, method):
+def batch_compare_learned_models(model_1, model_2, test_cases, return_divergence=False):
+    compiled_1, compiled_2 = compile_mealy(model_1), compile_mealy(model_2)
+    transitions_1, output_fun_1 = compiled_1.transitions, compiled_1.output_fun
+    transitions_2, output_fun_2 = compiled_2.aligned_to(compiled_1)
+
+    if not isinstance(test_cases, EncodedTestSuite):
+        test_cases = EncodedTestSuite.from_sequences(test_cases)
+    symbol_map = np.array([compiled_1.inputs.index.get(i, -1) for i in test_cases.alphabet.symbols], dtype=np.int32)
+    if (symbol_map < 0).any():
+        raise KeyError(test_cases.alphabet.symbols[int(np.argmin(symbol_map))])
+    batch, lengths = test_cases.padded(symbol_map)
+
+    divergence = np.full(len(test_cases), -1, dtype=np.int64)
+
+    # indices of test cases that are neither finished nor diverged, and the current states of both models for them
+    alive = np.arange(len(test_cases))
+    states_1 = np.full(len(alive), compiled_1.initial_state, dtype=np.int32)
+    states_2 = np.full(len(alive), compiled_2.initial_state, dtype=np.int32)
+
+    for step in range(batch.shape[1]):
+        running = lengths[alive] > step
+        alive, states_1, states_2 = alive[running], states_1[running], states_2[running]
+        if not len(alive):
+            break
+
+        inputs = batch[alive, step]
+        outputs_1, outputs_2 = output_fun_1[states_1, inputs], output_fun_2[states_2, inputs]
+        states_1, states_2 = transitions_1[states_1, inputs], transitions_2[states_2, inputs]
+        undefined = (states_1 < 0) | (states_2 < 0)
+        if undefined.any():
+            raise KeyError(compiled_1.inputs.symbols[inputs[np.argmax(undefined)]])
+
+        diverged = outputs_1 != outputs_2
+        if diverged.any():
+            divergence[alive[diverged]] = step
+            equal = ~diverged
+            alive, states_1, states_2 = alive[equal], states_1[equal], states_2[equal]
+
+    diff = int((divergence >= 0).sum()) / len(test_cases)
+    if return_divergence:
+        return diff, divergence
+    return diff
+
+
+class ConformanceEstimate:
+    """
+    Conformance in percent with the bounds of its confidence interval, estimated from test_cases_used test cases.
+    """
+
+    def __init__(self, conformance, lower, upper, test_cases_used) -> None:
+        self.conformance = conformance
+        self.lower = lower
+        self.upper = upper
+        self.test_cases_used = test_cases_used
+
+    def half_width(self):
+        return (self.upper - self.lower) / 2
+
+
+def wilson_interval(successes, trials, z):
+    """
+    Wilson score interval of a binomial proportion for the standard normal quantile z.
+    """
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    half_width = z * sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0., center - half_width), min(1., center + half_width)
+
+
+def estimate_conformance(model_1, model_2, test_cases, confidence=0.95, max_half_width=1., batch_size=100, rng=random):
+    """
+    Sequential estimate of the conformance of two models: test cases are evaluated in random order (shuffled with
+    rng), batch by batch, until the Wilson score interval of the conformance at the given confidence is at most
+    max_half_width percentage points wide on either side. Batches start with batch_size test cases and then double,
+    so that the number of vectorized evaluations stays logarithmic in the suite size. The interval is checked after
+    every batch without a correction for the repeated checks, so it is an approximate stopping rule rather than an
+    exact sequential test.
+    If the whole suite is evaluated, the conformance on the suite is exact and both bounds equal the estimate.
+    """
+    if not len(test_cases):
+        raise ValueError('The conformance cannot be estimated on an empty test suite.')
+    if not isinstance(test_cases, EncodedTestSuite):
+        test_cases = EncodedTestSuite.from_sequences(test_cases)
+    order = np.random.default_rng(rng.getrandbits(64)).permutation(len(test_cases))
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+
+    equal, used = 0, 0
+    while used < len(order):
+        batch = order[used:used + max(batch_size, used)]
+        _, divergence = batch_compare_learned_models(model_1, model_2, test_cases.subset(batch), return_divergence=True)
+        equal += int((divergence < 0).sum())
+        used += len(batch)
+        if used == len(order):
+            break
+
+        lower, upper = wilson_interval(equal, used, z)
+        if (upper - lower) / 2 * 100 <= max_half_width:
+            return ConformanceEstimate(equal / used * 100, lower * 100, upper * 100, used)
+
+    conformance = equal / used * 100
+    return ConformanceEstimate(conformance, conformance, conformance, used)
+
+
+class SequentialConformance:
+    """
+    Settings of estimate_conformance, for experiments that estimate their random conformance sequentially.
+    """
+
+    def __init__(self, confidence=0.95, max_half_width=1., batch_size=100) -> None:
+        self.confidence = confidence
+        self.max_half_width = max_half_width
+        self.batch_size = batch_size
+
+    def estimate(self, model_1, model_2, test_cases):
+        return estimate_conformance(model_1, model_2, test_cases, self.confidence, self.max_half_width,
+                                    self.batch_size)
+
+
+def check_equivalence(model_1, model_2):
+    """
+    Decides whether two Mealy machines are equivalent by a breadth-first exploration of their product automaton.
+    Inputs that are defined in only one of the machines count as distinguishing.
+
+    Returns:
+
+        (True, None) if the machines are equivalent, (False, counterexample) otherwise, where counterexample is a
+        shortest input sequence on which the output sequences differ
+
+    """
+    compiled_1, compiled_2 = compile_mealy(model_1), compile_mealy(model_2)
+    inputs = SymbolTable(compiled_1.inputs.symbols + compiled_2.inputs.symbols)
+    transitions_1, output_fun_1 = (t.tolist() for t in compiled_1.aligned_tables(inputs, compiled_1.outputs))
+    transitions_2, output_fun_2 = (t.tolist() for t in compiled_2.aligned_tables(inputs, compiled_1.outputs))
+
+    initial_pair = (compiled_1.initial_state, compiled_2.initial_state)
+    # maps each visited pair of states to its BFS predecessor and the input leading to it
+    predecessor = {initial_pair: None}
+    queue = deque([initial_pair])
+    while queue:
+        pair = queue.popleft()
+        s_1, s_2 = pair
+        for i in range(len(inputs)):
+            if output_fun_1[s_1][i] != output_fun_2[s_2][i]:
+                counterexample = [i]
+                while predecessor[pair] is not None:
+                    pair, i = predecessor[pair]
+                    counterexample.append(i)
+                return False, tuple(inputs.decode(reversed(counterexample)))
+
+            next_pair = (transitions_1[s_1][i], transitions_2[s_2][i])
+            # input is undefined in both machines
+            if next_pair[0] < 0:
+                continue
+            if next_pair not in predecessor:
+                predecessor[next_pair] = (pair, i)
+                queue.append(next_pair)
+
+    return True, None
+
+
+def create_test_cases(experiment_list, num_test_cases, method, seed=None, cache=None):
+    """
+    Generates a test suite per model. If a seed is given, the suite of each model is generated from a seed derived
+    from the seed, the model structure and the suite parameters. Suites generated with a seed are stored in and loaded
+    from the optional SuiteCache, and returned as EncodedTestSuite in that case.
+    """
     assert method in {'coverage', 'random'}
     test_cases = dict()
     for model_name, model in experiment_list:
+        key = suite_key(model, method, num_test_cases, seed) if seed is not None else None
+        if cache is not None and key is not None:
+            cached_test_cases = cache.get(key)
+            if cached_test_cases is not None:
+                test_cases[model_name] = cached_test_cases
+                continue
+
+        global_state = None
+        if key is not None:
+            # the oracles draw from the global random module: the suite is generated from a state of its own and the
+            # global state is restored afterwards, so that it does not depend on whether the suite was cached
+            global_state = random.getstate()
+            random.seed(int(key[:16], 16))
+
         inputs = model.get_input_alphabet()
         walks_per_state = ceil(num_test_cases / model.size)
         if method == 'coverage':
+            # the oracle walks from the state prefixes and would otherwise search missing ones state by state
+            for state, prefix in zip(model.states, model_analysis(model).state_cover()):
+                if state.prefix is None:
+                    state.prefix = prefix
             eq_oracle = StatePrefixEqOracle(inputs, sul=None, walks_per_state=walks_per_state, walk_len=10)
         else:
             # min size: size of smallest model
             # max size: doubled size of largest model
             eq_oracle = RandomWordEqOracle(inputs, sul=None, num_walks=num_test_cases, min_walk_len=3,
                                            max_walk_len=16 * 2)
-        test_cases[model_name] = [tc[0] for tc in generate_test_cases(model, eq_oracle)]
+        try:
+            test_cases[model_name] = [tc[0] for tc in generate_test_cases(model, eq_oracle)]
+        finally:
+            if global_state is not None:
+                random.setstate(global_state)
+
+        if cache is not None and key is not None:
+            test_cases[model_name] = cache.put(key, test_cases[model_name])
 
     return test_cases
 
@@ -96,6 +309,6 @@ def increasing_parameters_exp(model):
 
 
 def compute_shortest_prefixes(model: MealyMachine):
-    for state in model.states:
-        state.prefix = model.get_shortest_path(model.initial_state, state)
+    for state, prefix in zip(model.states, model_analysis(model).state_cover()):
+        state.prefix = prefix
     return model
@@ -0,0 +1,235 @@
+from array import array
+from collections.abc import Sequence
+
+from compiled_automata import SymbolTable
+
+# output id of nodes without output
+no_output = -1
+
+# fan-out above which the children of a node are indexed by a dict instead of its sibling list
+max_sibling_list_len = 16
+
+
+class PrefixTrie:
+    """
+    Prefix tree stored in flat node arrays: for every node, its parent and the interned input and output of the
+    transition leading to it (array('i') symbol buffers, see compiled_automata.SymbolTable). Node 0 is the root,
+    nodes are numbered in insertion order. If a model is given, inserted sequences are labelled while they are
+    inserted, by stepping the model once per new node.
+
+    Children are found through a child index of two more node arrays, the first child of every node and the next
+    sibling of every node, and model states are kept per node while the trie grows. Both cost a constant number of
+    bytes per node; seal() drops them once the trie is complete, so that only the arrays above remain. They are
+    rebuilt on the next insertion. Sibling lists are only searched up to max_sibling_list_len children: the children
+    of a node with a larger fan-out are moved to a dict input -> child, referred to by a negative first child, so that
+    lookups stay constant time for any alphabet.
+    """
+
+    def __init__(self, model=None) -> None:
+        self.model = model
+        self.input_symbols = SymbolTable()
+        self.output_symbols = SymbolTable()
+        self.parent = array('l', [-1])
+        self.inputs = array('i', [0])
+        self.outputs = array('i', [no_output])
+        self._children = array('l', [-1]), array('l', [-1]), []
+        self._states = [model.initial_state] if model is not None else None
+
+    def __len__(self):
+        return len(self.parent)
+
+    def _child_index(self):
+        if self._children is None:
+            first_child, next_sibling = array('l', [-1]) * len(self), array('l', [-1]) * len(self)
+            for node in range(len(self) - 1, 0, -1):
+                next_sibling[node] = first_child[self.parent[node]]
+                first_child[self.parent[node]] = node
+            self._children = first_child, next_sibling, []
+        return self._children
+
+    def _node_states(self):
+        if self._states is None and self.model is not None:
+            self._states = [self.model.initial_state]
+            for node in range(1, len(self)):
+                i = self.input_symbols.symbols[self.inputs[node]]
+                self._states.append(self._states[self.parent[node]].transitions[i])
+        return self._states
+
+    def seal(self):
+        """
+        Releases the child index and the model states.
+        """
+        self._children = None
+        self._states = None
+
+    def _find_child(self, node, input_id, children):
+        first_child, next_sibling, child_dicts = children
+        child = first_child[node]
+        if child < -1:
+            return child_dicts[-2 - child].get(input_id, -1)
+        inputs = self.inputs
+        fan_out = 0
+        while child >= 0 and inputs[child] != input_id:
+            child = next_sibling[child]
+            fan_out += 1
+        if fan_out > max_sibling_list_len:
+            self._index_children(node, children)
+        return child
+
+    def _index_children(self, node, children):
+        first_child, next_sibling, child_dicts = children
+        child_dict = dict()
+        child = first_child[node]
+        while child >= 0:
+            child_dict[self.inputs[child]] = child
+            child = next_sibling[child]
+        first_child[node] = -2 - len(child_dicts)
+        child_dicts.append(child_dict)
+
+    def _step(self, node, i, children, states):
+        input_id = self.input_symbols.add(i)
+        child = self._find_child(node, input_id, children)
+        if child < 0:
+            child = len(self.parent)
+            first_child, next_sibling, child_dicts = children
+            if first_child[node] < -1:
+                child_dicts[-2 - first_child[node]][input_id] = child
+                next_sibling.append(-1)
+            else:
+                next_sibling.append(first_child[node])
+                first_child[node] = child
+            first_child.append(-1)
+            self.parent.append(node)
+            self.inputs.append(input_id)
+            if states is not None:
+                state = states[node]
+                states.append(state.transitions[i])
+                self.outputs.append(self.output_symbols.add(state.output_fun[i]))
+            else:
+                self.outputs.append(no_output)
+        return child
+
+    def insert(self, seq, output=None):
+        """
+        Inserts seq and returns its node. Without a model, output is the output of the last input of seq.
+        """
+        children, states = self._child_index(), self._node_states()
+        node = 0
+        for i in seq:
+            node = self._step(node, i, children, states)
+        if output is not None:
+            self.outputs[node] = self.output_symbols.add(output)
+        return node
+
+    def insert_trace(self, inputs, outputs):
+        """
+        Inserts a trace, labelling every prefix with the output of its last input, and returns the node of the trace.
+        Raises a ValueError if an output differs from the output of the same prefix in an earlier trace.
+        """
+        children, states = self._child_index(), self._node_states()
+        node = 0
+        for i, o in zip(inputs, outputs):
+            node = self._step(node, i, children, states)
+            output_id = self.output_symbols.add(o)
+            if self.outputs[node] == no_output:
+                self.outputs[node] = output_id
+            elif self.outputs[node] != output_id:
+                raise ValueError(f'Non-determinism detected: {self.output(node)} vs {o} after {self.prefix(node)}.')
+        return node
+
+    def child(self, node, i):
+        input_id = self.input_symbols.index.get(i)
+        child = -1 if input_id is None else self._find_child(node, input_id, self._child_index())
+        return child if child >= 0 else None
+
+    def output(self, node):
+        output_id = self.outputs[node]
+        return self.output_symbols.symbols[output_id] if output_id != no_output else None
+
+    def prefix(self, node):
+        prefix = []
+        while node > 0:
+            prefix.append(self.input_symbols.symbols[self.inputs[node]])
+            node = self.parent[node]
+        return tuple(reversed(prefix))
+
+    def depth(self, node):
+        depth = 0
+        while node > 0:
+            depth += 1
+            node = self.parent[node]
+        return depth
+
+    def preorder(self):
+        """
+        Yields all nodes except the root in depth-first preorder, children in insertion order. This is the order in
+        which the prefixes of the maximal sequences occur first.
+        """
+        children = [[] for _ in range(len(self))]
+        for node in range(1, len(self)):
+            children[self.parent[node]].append(node)
+
+        stack = [iter(children[0])]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                continue
+            yield node
+            stack.append(iter(children[node]))
+
+    def leaves(self):
+        """
+        Nodes of the maximal sequences, i.e. sequences that are not a prefix of another sequence, in preorder.
+        """
+        is_inner = bytearray(len(self))
+        for node in range(1, len(self)):
+            is_inner[self.parent[node]] = 1
+        return [node for node in self.preorder() if not is_inner[node]]
+
+    def prefix_closed_data(self):
+        """
+        (prefix, output) pairs of all nodes in preorder.
+        """
+        return list(SampleView(self, list(self.preorder())))
+
+    def leaf_data(self):
+        """
+        (sequence, output) pairs of the maximal sequences.
+        """
+        return list(SampleView(self, self.leaves()))
+
+
+class SampleView(Sequence):
+    """
+    Read-only view of labelled samples stored in a PrefixTrie, one node per sample. Samples are decoded to
+    (input sequence, output) pairs only when they are accessed; consumers that build a tree themselves (IncrementalRPNI,
+    TelemetryCacheSUL.preload) read the nodes and the trie arrays directly instead.
+    """
+
+    def __init__(self, trie: PrefixTrie, nodes) -> None:
+        self.trie = trie
+        self.nodes = nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SampleView(self.trie, self.nodes[index])
+        node = self.nodes[index]
+        return self.trie.prefix(node), self.trie.output(node)
+
+    def __iter__(self):
+        # nodes are mostly visited after their parent, so decoded prefixes are reused
+        trie, prefixes = self.trie, {0: ()}
+        for node in self.nodes:
+            prefix = prefixes.get(node)
+            if prefix is None:
+                parent_prefix = prefixes.get(trie.parent[node])
+                if parent_prefix is None:
+                    prefix = trie.prefix(node)
+                else:
+                    prefix = parent_prefix + (trie.input_symbols.symbols[trie.inputs[node]],)
+                prefixes[node] = prefix
+            yield prefix, trie.output(node)
@@ -0,0 +1,368 @@
+import json
+import sqlite3
+import sys
+
+from aalpy.base import SUL
+from aalpy.base.CacheTree import Node
+from aalpy.base.SUL import CacheSUL
+
+from prefix_trie import SampleView
+
+
+class CacheTelemetry:
+    def __init__(self, nodes, memory_bytes, membership_hits, membership_misses, equivalence_hits,
+                 equivalence_misses, longest_cached_prefix) -> None:
+        self.nodes = nodes
+        self.memory_bytes = memory_bytes
+        self.membership_hits = membership_hits
+        self.membership_misses = membership_misses
+        self.equivalence_hits = equivalence_hits
+        self.equivalence_misses = equivalence_misses
+        self.longest_cached_prefix = longest_cached_prefix
+
+    @staticmethod
+    def _ratio(hits, misses):
+        return round(hits / (hits + misses) * 100, 2) if hits + misses else 0
+
+    def membership_hit_ratio(self):
+        return self._ratio(self.membership_hits, self.membership_misses)
+
+    def equivalence_hit_ratio(self):
+        return self._ratio(self.equivalence_hits, self.equivalence_misses)
+
+
+class TelemetryCacheSUL(CacheSUL):
+    """
+    CacheSUL that can be preloaded with labelled data and records how the cache is used.
+
+    Membership queries reach the SUL through query(), equivalence oracle traces through pre()/step()/post(). A
+    membership query is a hit if it is answered from the cache; an equivalence query is a hit if its whole trace was
+    already contained in the cache (it is executed on the system nonetheless, as in CacheSUL). longest_cached_prefix
+    is the longest prefix of any query that was contained in the cache, whether the query was a hit or not.
+    """
+
+    def __init__(self, sul):
+        super().__init__(sul)
+        self.membership_hits = 0
+        self.membership_misses = 0
+        self.equivalence_hits = 0
+        self.equivalence_misses = 0
+        self.longest_cached_prefix = 0
+        self._trace_cached = True
+        self._trace_len = 0
+        self._cached_prefix_len = 0
+
+    def preload(self, data, model=None):
+        """
+        Builds the cache tree from (input sequence, output) pairs in one pass. A pair only creates the node of its
+        sequence, so the data has to be prefix-closed; if a model is given, sequences with missing prefixes are
+        labelled with the model instead. A SampleView is inserted node by node from its trie, without decoding the
+        sequences.
+        """
+        if isinstance(data, SampleView):
+            self._preload_view(data, model)
+            return
+
+        nodes = {(): self.cache.root_node}
+        for seq, output in data:
+            seq = tuple(seq)
+            if not seq:
+                continue
+            parent = nodes.get(seq[:-1])
+            if parent is None:
+                if model is None:
+                    raise ValueError(f'Prefix of {seq} is missing in the data. Provide a model to label it.')
+                node = self.cache.root_node
+                for k, (i, o) in enumerate(zip(seq, model.compute_output_seq(model.initial_state, seq))):
+                    node = self._insert_child(node, i, o)
+                    nodes[seq[:k + 1]] = node
+                continue
+            nodes[seq] = self._insert_child(parent, seq[-1], output)
+
+    def _preload_view(self, view, model=None):
+        trie = view.trie
+        cache_nodes = [None] * len(trie)
+        cache_nodes[0] = self.cache.root_node
+        for trie_node in view.nodes:
+            path = []
+            node = trie_node
+            while cache_nodes[node] is None:
+                path.append(node)
+                node = trie.parent[node]
+
+            cache_node = cache_nodes[node]
+            for node in reversed(path):
+                output = trie.output(node)
+                if node != trie_node and model is None:
+                    raise ValueError(f'Prefix of {trie.prefix(trie_node)} is missing in the data. '
+                                     f'Provide a model to label it.')
+                if output is None:
+                    output = model.compute_output_seq(model.initial_state, trie.prefix(node))[-1]
+                cache_node = self._insert_child(cache_node, trie.input_symbols.symbols[trie.inputs[node]], output)
+                cache_nodes[node] = cache_node
+
+    @staticmethod
+    def _insert_child(node, i, output):
+        child = node.children.get(i)
+        if child is None:
+            child = Node(output)
+            node.children[i] = child
+        elif child.value != output:
+            raise ValueError(f'Non-determinism detected: {child.value} vs {output} after input {i}.')
+        return child
+
+    def query(self, word):
+        node, cached_prefix_len = self.cache.root_node, 0
+        for i in word:
+            node = node.children.get(i)
+            if node is None:
+                break
+            cached_prefix_len += 1
+        self.longest_cached_prefix = max(self.longest_cached_prefix, cached_prefix_len)
+
+        cached_query = self.cache.in_cache(word)
+        if cached_query:
+            self.membership_hits += 1
+            self.num_cached_queries += 1
+            return cached_query
+        self.membership_misses += 1
+
+        out = self.sul.query(word)
+
+        self.cache.reset()
+        for i, o in zip(word, out):
+            self.cache.step_in_cache(i, o)
+
+        self.num_queries += 1
+        self.num_steps += len(word)
+        return out
+
+    def pre(self):
+        self._finish_trace()
+        super().pre()
+        self._trace_cached = True
+
+    def step(self, letter):
+        if self._trace_cached:
+            if letter in self.cache.curr_node.children:
+                self._cached_prefix_len += 1
+            else:
+                self._trace_cached = False
+        self._trace_len += 1
+        return super().step(letter)
+
+    def post(self):
+        super().post()
+        self._finish_trace()
+
+    def _finish_trace(self):
+        # oracles do not necessarily call post() after their last trace, so traces are also finished by pre()
+        if self._trace_len == 0:
+            return
+        if self._trace_cached:
+            self.equivalence_hits += 1
+        else:
+            self.equivalence_misses += 1
+        self.longest_cached_prefix = max(self.longest_cached_prefix, self._cached_prefix_len)
+        self._trace_len = 0
+        self._cached_prefix_len = 0
+
+    def telemetry(self):
+        self._finish_trace()
+        nodes, memory_bytes = 0, 0
+        stack = [self.cache.root_node]
+        while stack:
+            node = stack.pop()
+            nodes += 1
+            memory_bytes += sys.getsizeof(node) + sys.getsizeof(node.children)
+            stack.extend(node.children.values())
+
+        return CacheTelemetry(nodes, memory_bytes, self.membership_hits, self.membership_misses,
+                              self.equivalence_hits, self.equivalence_misses, self.longest_cached_prefix)
+
+
+class PersistentQueryCache:
+    """
+    Query cache tree stored in an SQLite database, so that it outlives a learning run and can be shared by several
+    runs and processes. Every node is one row (parent, input, output); the root of every system is a row with parent
+    -1 whose input is the name of the system. Symbols are stored JSON-encoded.
+
+    The database runs in WAL mode and the new nodes of every trace are committed in one transaction as soon as the
+    trace is finished, so an interrupted run leaves a consistent cache behind and concurrent writers only wait for
+    the insertion of single traces. Nodes that were read once are kept in memory (nodes are never changed once
+    written).
+    """
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS nodes (id INTEGER PRIMARY KEY, parent INTEGER NOT NULL, '
+                                'input TEXT NOT NULL, output TEXT, UNIQUE (parent, input))')
+        # (parent, encoded input) -> (child, output)
+        self._children = dict()
+        self._encoded = dict()
+
+    def _encode(self, symbol):
+        encoded = self._encoded.get(symbol)
+        if encoded is None:
+            encoded = self._encoded[symbol] = json.dumps(symbol)
+        return encoded
+
+    def root(self, system):
+        self.connection.execute('INSERT OR IGNORE INTO nodes (parent, input) VALUES (-1, ?)', (system,))
+        return self.connection.execute('SELECT id FROM nodes WHERE parent = -1 AND input = ?', (system,)).fetchone()[0]
+
+    def child(self, node, i):
+        """
+        Returns:
+
+            (child node, output) of input i in node, None if it is not cached
+
+        """
+        key = node, self._encode(i)
+        child = self._children.get(key)
+        if child is None:
+            row = self.connection.execute('SELECT id, output FROM nodes WHERE parent = ? AND input = ?', key).fetchone()
+            if row is None:
+                return None
+            child = self._children[key] = row[0], json.loads(row[1])
+        return child
+
+    def add_path(self, node, inputs, outputs):
+        """
+        Adds the path of the inputs and outputs below node in one transaction. Nodes that another run added before are
+        kept; a ValueError is raised if their output differs.
+        """
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            for i, output in zip(inputs, outputs):
+                key = node, self._encode(i)
+                cursor = self.connection.execute('INSERT OR IGNORE INTO nodes (parent, input, output) VALUES (?, ?, ?)',
+                                                 key + (json.dumps(output),))
+                if cursor.rowcount:
+                    self._children[key] = cursor.lastrowid, output
+                child = self.child(node, i)
+                if child[1] != output:
+                    raise ValueError(f'Non-determinism detected: {child[1]} vs {output} after input {i}.')
+                node = child[0]
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+
+# accountings of PersistentCacheSUL: 'uncached' reports queries and simulated times as if nothing was cached, 'actual'
+# only the queries executed on the system and their simulated time
+cache_accountings = ['uncached', 'actual']
+
+# path -> PersistentQueryCache opened by this process
+_persistent_caches = dict()
+
+
+def persistent_query_cache(path):
+    """
+    Returns the PersistentQueryCache of a database file, opened once per process.
+    """
+    cache = _persistent_caches.get(path)
+    if cache is None:
+        cache = _persistent_caches[path] = PersistentQueryCache(path)
+    return cache
+
+
+class PersistentCacheSUL(SUL):
+    """
+    Wraps a SUL with a PersistentQueryCache. Membership queries and equivalence oracle traces are answered from the
+    cache as long as their inputs are cached; the wrapped SUL is only reset on the first input that is not cached,
+    and the cached prefix is replayed on it (and checked against the cache) before execution continues.
+
+    The cache tree of a system is identified by its name, which has to be the same in every run on the same system.
+    Learning algorithms count the queries they pose (e.g. in aalpy's CacheSUL wrapper), not the ones executed on the
+    system. With accounting 'uncached', every trace answered entirely from the cache is charged to the wrapped SUL if
+    it has a charge(resets, steps) method (see SimulatedDeviceSUL), so query metrics and simulated times are the same
+    as without the cache, while the wall-clock time drops. With accounting 'actual', cached traces are not charged and
+    the queries executed on the system are to be reported instead (see executed_queries). num_cached_queries counts
+    the membership queries answered entirely from the cache.
+    """
+
+    def __init__(self, sul: SUL, path, system, accounting='uncached'):
+        super().__init__()
+        assert accounting in cache_accountings
+        self.sul = sul
+        self.cache = persistent_query_cache(path)
+        self.root = self.cache.root(system)
+        self.accounting = accounting
+        # membership queries, their steps, equivalence oracle traces and their steps executed on the wrapped SUL
+        self.executed_queries = [0, 0, 0, 0]
+        self._node = None
+        self._inputs = []
+        self._outputs = []
+        # number of leading inputs of the trace that were answered from the cache
+        self._cached_steps = 0
+        self._executing = False
+        self._in_query = False
+
+    @property
+    def simulated_time(self):
+        self._finish_trace()
+        return getattr(self.sul, 'simulated_time', 0)
+
+    def query(self, word):
+        self.pre()
+        self._in_query = True
+        out = [self.step(letter) for letter in word]
+        self.post()
+        self.num_queries += 1
+        self.num_steps += len(word)
+        return out
+
+    def pre(self):
+        self._finish_trace()
+        self._node = self.root
+
+    def post(self):
+        self._finish_trace()
+
+    def step(self, letter):
+        if not self._executing:
+            child = self.cache.child(self._node, letter)
+            if child is not None:
+                self._node = child[0]
+                self._inputs.append(letter)
+                self._outputs.append(child[1])
+                return child[1]
+
+            self.sul.pre()
+            self._executing = True
+            self._cached_steps = len(self._inputs)
+            for i, cached_output in zip(self._inputs, self._outputs):
+                output = self.sul.step(i)
+                if output != cached_output:
+                    raise ValueError(f'Non-determinism detected: {cached_output} vs {output} after input {i}.')
+
+        output = self.sul.step(letter)
+        self._inputs.append(letter)
+        self._outputs.append(output)
+        return output
+
+    def _finish_trace(self):
+        if self._node is None:
+            return
+        if self._executing:
+            self.sul.post()
+            self.cache.add_path(self._node, self._inputs[self._cached_steps:], self._outputs[self._cached_steps:])
+            kind = 0 if self._in_query else 2
+            self.executed_queries[kind] += 1
+            # the cached prefix was replayed on the system as well
+            self.executed_queries[kind + 1] += len(self._inputs)
+        else:
+            if self._in_query:
+                self.num_cached_queries += 1
+            if self.accounting == 'uncached' and hasattr(self.sul, 'charge'):
+                self.sul.charge(resets=1, steps=len(self._inputs))
+        self._in_query = False
+        self._node = None
+        self._inputs, self._outputs = [], []
+        self._executing = False
+
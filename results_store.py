@@ -0,0 +1,219 @@
+import argparse
+import csv
+import os
+import sys
+
+from checkpoint import CheckpointFile
+from csv_export import DataExporter, RPNIDataExporter, LStarExportEntry, RPNIExportEntry, CachedLStarExportEntry
+from data_classes import RunAggregate, l_star_summary, rpni_summary, cached_l_star_summary
+from experiment_runner import rpni_data_names, rpni_model_minimized_char_set_str, l_star_str, cached_l_star_str
+from instrumentation import phase_attr, phase_metrics, l_star_phases, rpni_phases, cached_l_star_phases
+
+# record type -> phases whose metrics are stored with every record
+record_phases = {'LStarExperiment': l_star_phases, 'RPNIExperiment': rpni_phases,
+                 'CachedLStarExperiment': cached_l_star_phases}
+
+
+def _encode(value):
+    return '' if value is None else str(value)
+
+
+def _decode(value):
+    if value == '':
+        return None
+    if value in ('True', 'False'):
+        return value == 'True'
+    for number_type in (int, float):
+        try:
+            return number_type(value)
+        except ValueError:
+            pass
+    return value
+
+
+class ResultsStore:
+    """
+    Append-only store of raw experiment records. Every run (e.g. one invocation of main.py) has its own directory
+    <directory>/<run_id> with one CSV file per record type, and every record is appended as one row, together with
+    its model, experiment and repetition, as soon as it is produced. Phases are flattened into one column per
+    metric (see instrumentation.phase_attr).
+
+    Aggregates are computed in a single pass over the rows, so the summaries of any number of repetitions can be
+    derived from the store in constant memory and without rerunning the experiments.
+
+    The store also checkpoints the run in a CheckpointFile: the settings it was started with and every appended
+    (experiment, model, repetition) unit. A unit is recorded only after its row is on disk, so after an interruption
+    recover() restores a consistent state from which the run can be resumed.
+    """
+
+    def __init__(self, directory, run_id) -> None:
+        self.run_id = run_id
+        self.path = os.path.join(directory, run_id)
+        self.checkpoint = CheckpointFile(os.path.join(self.path, 'checkpoint.jsonl'))
+
+    def _file(self, record_type):
+        return os.path.join(self.path, f'{record_type}.csv')
+
+    def append(self, model_name, experiment, repeat, record):
+        record_type = type(record).__name__
+        row = {'model': model_name, 'experiment': experiment, 'repeat': repeat}
+        row.update((field, value) for field, value in vars(record).items() if field != 'phases')
+        for phase in record_phases[record_type]:
+            for metric in phase_metrics:
+                row[phase_attr(phase, metric)] = None if record.phases is None else \
+                    record.phases.get(phase, dict()).get(metric, 0)
+
+        os.makedirs(self.path, exist_ok=True)
+        path = self._file(record_type)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            if new_file:
+                writer.writeheader()
+            writer.writerow({column: _encode(value) for column, value in row.items()})
+            f.flush()
+            os.fsync(f.fileno())
+        self.checkpoint.append({'type': 'unit', 'experiment': experiment, 'model': model_name, 'repeat': repeat})
+
+    def start(self, settings):
+        """
+        Records the settings of a new run.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        self.checkpoint.append({'type': 'settings', **settings})
+
+    def settings(self):
+        """
+        Settings the run was started with, None if it was not started.
+        """
+        return next((r for r in self.checkpoint.load() if r['type'] == 'settings'), None)
+
+    def recover(self):
+        """
+        Removes the rows of units that are not checkpointed (written when the run was interrupted) from the store.
+
+        Returns:
+
+            set of the (experiment, model, repeat) keys of all checkpointed units
+
+        """
+        completed = {(r['experiment'], r['model'], r['repeat']) for r in self.checkpoint.load() if r['type'] == 'unit'}
+        for record_type in record_phases:
+            path = self._file(record_type)
+            if not os.path.exists(path):
+                continue
+            with open(path, newline='', encoding='utf-8') as f:
+                header, *rows = list(csv.reader(f)) or [[]]
+
+            kept, seen = [], set()
+            for row in rows:
+                if len(row) != len(header):
+                    continue
+                key = row[1], row[0], int(row[2])
+                if key in completed and key not in seen:
+                    kept.append(row)
+                    seen.add(key)
+            if not kept:
+                os.remove(path)
+                continue
+            if len(kept) == len(rows):
+                continue
+
+            with open(path + '.tmp', 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(kept)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + '.tmp', path)
+        return completed
+
+    def rows(self, record_type):
+        """
+        Lazily yields the stored records of a type as dicts with decoded values.
+        """
+        path = self._file(record_type)
+        if not os.path.exists(path):
+            return
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                yield {column: _decode(value) for column, value in row.items()}
+
+    def aggregate(self, record_type):
+        """
+        Returns:
+
+            dict (model, experiment) -> RunAggregate of all stored records of the type, in the order in which the
+            experiments first occur in the store
+
+        """
+        aggregates = dict()
+        for row in self.rows(record_type):
+            key = row.pop('model'), row.pop('experiment')
+            del row['repeat']
+            aggregates.setdefault(key, RunAggregate()).add(row)
+        return aggregates
+
+    def model_names(self):
+        names = dict()
+        for row in self.rows('LStarExperiment'):
+            names[row['model']] = None
+        return list(names)
+
+
+def export_summaries(store, benchmark, model_names=None, verbose=True, export_csv=True, instrumented=False):
+    """
+    Prints the summaries of all models in the store and exports them to the CSV files of main.py. Experiments that
+    were not executed in the run are skipped.
+    """
+    l_star_data = store.aggregate('LStarExperiment')
+    rpni_data = store.aggregate('RPNIExperiment')
+    cached_l_star_data = store.aggregate('CachedLStarExperiment')
+
+    l_star_data_export = DataExporter(LStarExportEntry.pretty_printed_attr(instrumented))
+    rpni_data_export = RPNIDataExporter(RPNIExportEntry.pretty_printed_attr(instrumented))
+    cached_l_star_data_export = DataExporter(CachedLStarExportEntry.pretty_printed_attr(instrumented))
+    rpni_experiments = rpni_data_names + [rpni_model_minimized_char_set_str]
+
+    for model_name in model_names or store.model_names():
+        if verbose:
+            print(f'\n\n------------------{model_name}------------------')
+        l_star_data_export.add_entry(model_name, l_star_summary(l_star_data[(model_name, l_star_str)], verbose))
+
+        if rpni_data:
+            rpni_data_export.add_model(model_name)
+            model_rpni_data = {name: rpni_data[(model_name, name)] for name in rpni_experiments}
+            rpni_data_export.add_entry(model_name, rpni_summary(model_rpni_data, rpni_data_names,
+                                                                rpni_model_minimized_char_set_str, verbose))
+
+        if cached_l_star_data:
+            cached_l_star_data_export.add_entry(model_name, cached_l_star_summary(
+                cached_l_star_data[(model_name, cached_l_star_str)], verbose))
+
+    if export_csv:
+        l_star_data_export.export_csv(f'{benchmark}_l_star_data')
+        if rpni_data:
+            rpni_data_export.export_csv(f'{benchmark}_rpni_data', rpni_experiments)
+        if cached_l_star_data:
+            cached_l_star_data_export.export_csv(f'{benchmark}_cached_l_star_data')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Derives the summary CSVs of main.py from a results store.')
+    parser.add_argument('run_id')
+    parser.add_argument('--results-dir', default='results')
+    parser.add_argument('--benchmark', default=None, help='prefix of the CSV files (default: the run id)')
+    parser.add_argument('--instrumented', action='store_true', help='include the phase metrics')
+    parser.add_argument('--quiet', action='store_true', help='do not print the summaries')
+    args = parser.parse_args()
+
+    store = ResultsStore(args.results_dir, args.run_id)
+    if not store.model_names():
+        print(f'No results stored for run {args.run_id} in {args.results_dir}.')
+        return 1
+    export_summaries(store, args.benchmark or args.run_id, verbose=not args.quiet, instrumented=args.instrumented)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
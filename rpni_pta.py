@@ -0,0 +1,154 @@
+from array import array
+
+from aalpy.automata import MealyMachine, MealyState
+
+from prefix_trie import no_output
+
+
+class FlatPTA:
+    """
+    Prefix tree acceptor (PTA) of RPNI for Mealy machines, stored in flat integer arrays: inputs and outputs are
+    interned, the transitions of node n are transitions[n * k:(n + 1) * k] for k inputs (-1 if undefined) and the
+    output of the transition leading to a node is outputs[n]. Samples can be inserted at any time, so the PTA can grow
+    between learning runs (see IncrementalRPNI).
+    """
+
+    def __init__(self) -> None:
+        self.inputs = []
+        self.input_ids = dict()
+        self.output_symbols = []
+        self.output_ids = dict()
+        self.k = 0
+        self.transitions = array('l')
+        self.outputs = array('l', [-1])
+        self.depth = array('l', [0])
+        # inputs of the defined transitions of every node, in the order in which they were added
+        self.input_order = [[]]
+
+    def __len__(self):
+        return len(self.outputs)
+
+    def add_inputs(self, symbols):
+        for symbol in symbols:
+            if symbol not in self.input_ids:
+                self.input_ids[symbol] = len(self.inputs)
+                self.inputs.append(symbol)
+        if len(self.inputs) > self.k:
+            # new inputs widen the transition rows of all nodes
+            k, new_k = self.k, len(self.inputs)
+            transitions = array('l', [-1]) * (len(self) * new_k)
+            for node in range(len(self)):
+                transitions[node * new_k:node * new_k + k] = self.transitions[node * k:(node + 1) * k]
+            self.transitions, self.k = transitions, new_k
+
+    def add_outputs(self, labels):
+        for label in labels:
+            if label not in self.output_ids:
+                self.output_ids[label] = len(self.output_symbols)
+                self.output_symbols.append(label)
+
+    def add_child(self, node, i):
+        child = self.transitions[node * self.k + i]
+        if child < 0:
+            child = len(self.outputs)
+            self.transitions[node * self.k + i] = child
+            self.transitions.extend([-1] * self.k)
+            self.outputs.append(-1)
+            self.depth.append(self.depth[node] + 1)
+            self.input_order[node].append(i)
+            self.input_order.append([])
+        return child
+
+    def set_output(self, node, output_id):
+        if self.outputs[node] < 0:
+            self.outputs[node] = output_id
+        return self.outputs[node] == output_id
+
+    def insert(self, samples):
+        """
+        Inserts (input sequence, output) pairs, shortest first. Returns False if an output contradicts the output of
+        the same sequence in the PTA.
+        """
+        samples = sorted(samples, key=lambda x: len(x[0]))
+        self.add_inputs(i for seq, _ in samples for i in seq)
+        self.add_outputs(label for _, label in samples)
+        for seq, label in samples:
+            node = 0
+            for i in seq:
+                node = self.add_child(node, self.input_ids[i])
+            if not self.set_output(node, self.output_ids[label]):
+                return False
+        return True
+
+    def insert_nodes(self, trie, nodes, pta_nodes):
+        """
+        Inserts the samples of trie nodes (see SampleView), shortest first. pta_nodes maps every trie node to its PTA
+        node (-1 if it is not inserted yet) and is extended to the size of the trie. The interned inputs and outputs
+        of the trie are used as they are, so the PTA must not contain samples of another trie or of a list.
+        Returns False if an output contradicts the output of the same sequence in the PTA.
+        """
+        self.add_inputs(trie.input_symbols.symbols)
+        self.add_outputs(trie.output_symbols.symbols)
+        pta_nodes.extend([-1] * (len(trie) - len(pta_nodes)))
+        for trie_node in sorted(nodes, key=trie.depth):
+            # trie nodes on the path that are not in the PTA yet, deepest first
+            path = []
+            node = trie_node
+            while pta_nodes[node] < 0:
+                path.append(node)
+                node = trie.parent[node]
+
+            pta_node = pta_nodes[node]
+            for node in reversed(path):
+                pta_node = self.add_child(pta_node, trie.inputs[node])
+                pta_nodes[node] = pta_node
+            if trie.outputs[trie_node] != no_output and not self.set_output(pta_node, trie.outputs[trie_node]):
+                return False
+        return True
+
+    def check_prefix_closed(self, learner_name):
+        if -1 in self.outputs[1:]:
+            raise ValueError(f'{learner_name} requires prefix-closed data.')
+
+    def to_automaton(self, red, find, class_transitions, class_input_order):
+        """
+        Mealy machine of the red classes of a partition of the PTA, given by the representative of every node (find)
+        and the transitions and input order of every class, indexed by its representative.
+        """
+        k = self.k
+        states = {r: MealyState(f's{n}') for n, r in enumerate(red)}
+        for r in red:
+            for i in class_input_order[r]:
+                child = class_transitions[r * k + i]
+                states[r].transitions[self.inputs[i]] = states[find(child)]
+                states[r].output_fun[self.inputs[i]] = self.output_symbols[self.outputs[child]]
+        return MealyMachine(states[red[0]], list(states.values()))
+
+
+def insert_red(red, depth, node):
+    # insert after all red states with the same depth, as bisect.insort in aalpy's RPNI
+    position = len(red)
+    while position > 0 and depth[red[position - 1]] > depth[node]:
+        position -= 1
+    red.insert(position, node)
+
+
+def report_non_deterministic_data():
+    print('DATA provided to RPNI is not deterministic. Ensure that the data is deterministic, '
+          'or consider using Alergia.')
+
+
+def complete_model(learned_model, input_completeness, print_info=False):
+    """
+    Makes a learned model input complete with input_completeness ('sink_state' or 'self_loop') transitions, as
+    run_RPNI does. Without input_completeness, the model is returned as it is.
+    """
+    if not learned_model.is_input_complete():
+        if not input_completeness and print_info:
+            print('Warning: Learned Model is not input complete (inputs not defined for all states). '
+                  'Consider calling .make_input_complete()')
+        else:
+            if print_info:
+                print(f'Learned model was not input complete. Adapting it with {input_completeness} transitions.')
+            learned_model.make_input_complete(input_completeness)
+    return learned_model
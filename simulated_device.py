@@ -0,0 +1,161 @@
+import heapq
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+from aalpy.base import SUL
+
+
+class Latency:
+    """
+    Latency distribution in seconds: 'constant' (value), 'uniform' (low, high), 'normal' (mean, stdev; negative
+    samples are clipped to 0) or 'exponential' (mean).
+    """
+
+    def __init__(self, distribution='constant', *params) -> None:
+        assert distribution in {'constant', 'uniform', 'normal', 'exponential'}
+        self.distribution = distribution
+        self.params = params
+
+    def sample(self, rng):
+        if self.distribution == 'constant':
+            return self.params[0]
+        if self.distribution == 'uniform':
+            return rng.uniform(*self.params)
+        if self.distribution == 'normal':
+            return max(0., rng.gauss(*self.params))
+        return rng.expovariate(1 / self.params[0])
+
+
+class DeviceLatencies:
+    """
+    Latencies of a device: every step costs step latency, and with timeout_probability the device does not respond
+    and the step additionally costs the timeout latency. Every reset (pre) costs reset latency.
+    """
+
+    def __init__(self, step, reset, timeout=Latency('constant', 0), timeout_probability=0) -> None:
+        self.step = step
+        self.reset = reset
+        self.timeout = timeout
+        self.timeout_probability = timeout_probability
+
+    def step_cost(self, rng):
+        cost = self.step.sample(rng)
+        if self.timeout_probability and rng.random() < self.timeout_probability:
+            cost += self.timeout.sample(rng)
+        return cost
+
+    def reset_cost(self, rng):
+        return self.reset.sample(rng)
+
+    def query_cost(self, rng, length):
+        return self.reset_cost(rng) + sum(self.step_cost(rng) for _ in range(length))
+
+
+# rough latencies of the benchmark setups: BLE connection resets require a new advertisement/connection procedure,
+# MQTT resets only reconnect the clients to the broker
+device_profiles = {
+    'BLE': DeviceLatencies(step=Latency('normal', 0.03, 0.01), reset=Latency('normal', 1.0, 0.2),
+                           timeout=Latency('constant', 2.0), timeout_probability=0.01),
+    'MQTT': DeviceLatencies(step=Latency('normal', 0.005, 0.001), reset=Latency('normal', 0.05, 0.01),
+                            timeout=Latency('constant', 1.0), timeout_probability=0.001),
+}
+
+
+class SimulatedDeviceSUL(SUL):
+    """
+    Wraps a SUL and charges the latencies of a simulated device for every reset and step. The simulated time is
+    accumulated in simulated_time; with a time_scale > 0 the SUL also sleeps for time_scale times the latency, so that
+    measured wall-clock times include the waiting (time_scale=1 is real time).
+    Latencies are sampled from an own random generator, so the global random state is not affected.
+    """
+
+    def __init__(self, sul: SUL, latencies: DeviceLatencies, seed=None, time_scale=0):
+        super().__init__()
+        self.sul = sul
+        self.latencies = latencies
+        self.rng = random.Random(seed)
+        self.time_scale = time_scale
+        self.simulated_time = 0
+
+    def _wait(self, cost):
+        self.simulated_time += cost
+        if self.time_scale:
+            time.sleep(cost * self.time_scale)
+
+    def pre(self):
+        self._wait(self.latencies.reset_cost(self.rng))
+        self.sul.pre()
+
+    def post(self):
+        self.sul.post()
+
+    def step(self, letter):
+        self._wait(self.latencies.step_cost(self.rng))
+        return self.sul.step(letter)
+
+    def charge(self, resets=0, steps=0):
+        """
+        Charges the latencies of resets and steps that were not executed (e.g. answered by a query cache) to the
+        simulated time, without waiting. Latencies are sampled in the same order as when executing them.
+        """
+        for _ in range(resets):
+            self.simulated_time += self.latencies.reset_cost(self.rng)
+        for _ in range(steps):
+            self.simulated_time += self.latencies.step_cost(self.rng)
+
+
+class DevicePool:
+    """
+    Times the collection of independent queries on a number of simulated devices in parallel, each device driven by
+    its own thread. The latencies of all queries are sampled up front in query order, so the projected time does not
+    depend on the scheduling of the threads. Only the time is measured: the passive learning data is labelled by the
+    model when it is generated, so the outputs of the devices are not kept.
+    """
+
+    def __init__(self, sul_factory, latencies: DeviceLatencies, devices=1, seed=None, time_scale=0) -> None:
+        self.sul_factory = sul_factory
+        self.latencies = latencies
+        self.devices = devices
+        self.seed = seed
+        self.time_scale = time_scale
+
+    def collection_time(self, sequences):
+        """
+        Executes every sequence as one query.
+
+        Returns:
+
+            projected time (makespan of the simulated latencies when every query is scheduled on the device that
+            becomes free first) and measured wall-clock time
+
+        """
+        rng = random.Random(self.seed)
+        costs = [self.latencies.query_cost(rng, len(seq)) for seq in sequences]
+
+        device_free_at = [0.] * self.devices
+        for cost in costs:
+            heapq.heappush(device_free_at, heapq.heappop(device_free_at) + cost)
+        projected = max(device_free_at)
+
+        idle_devices = Queue()
+        for _ in range(self.devices):
+            idle_devices.put(self.sul_factory())
+
+        def execute(seq, cost):
+            sul = idle_devices.get()
+            try:
+                if self.time_scale:
+                    time.sleep(cost * self.time_scale)
+                sul.query(seq)
+            finally:
+                idle_devices.put(sul)
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.devices) as executor:
+            # consumed to wait for all queries and to raise their exceptions
+            list(executor.map(execute, sequences, costs))
+        measured = time.time() - start
+
+        return projected, measured
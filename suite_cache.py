@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+import time
+from hashlib import sha256
+from tempfile import mkdtemp
+
+import numpy as np
+
+from compiled_automata import EncodedTestSuite, SymbolTable, model_fingerprint
+
+
+def suite_key(model, method, num_test_cases, seed):
+    """
+    Content address of a generated test suite: the model structure and all parameters that determine the suite.
+    """
+    return sha256(repr((model_fingerprint(model), method, num_test_cases, seed)).encode('utf-8')).hexdigest()
+
+
+class SuiteCache:
+    """
+    On-disk cache of generated test suites. Every entry is a directory named after its suite_key that contains the
+    flat integer-encoded inputs, the offsets of the test cases and the input alphabet. Entries are memory-mapped when
+    loaded, and the least recently used entries are evicted once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, directory='.test_suite_cache', max_bytes=256 * 2 ** 20) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        entry = self._entry(key)
+        if not os.path.isdir(entry):
+            return None
+
+        with open(os.path.join(entry, 'alphabet.json'), encoding='utf-8') as f:
+            alphabet = SymbolTable(json.load(f))
+        symbols = np.load(os.path.join(entry, 'symbols.npy'), mmap_mode='r')
+        offsets = np.load(os.path.join(entry, 'offsets.npy'), mmap_mode='r')
+
+        # mark the entry as recently used
+        os.utime(entry)
+        return EncodedTestSuite(symbols, offsets, alphabet)
+
+    def put(self, key, test_cases):
+        """
+        Stores the test cases under the given key and returns them as memory-mapped EncodedTestSuite.
+        The entry is written to a temporary directory first and renamed, so readers never see partial entries.
+        """
+        suite = test_cases if isinstance(test_cases, EncodedTestSuite) else EncodedTestSuite.from_sequences(test_cases)
+
+        tmp_entry = mkdtemp(dir=self.directory, prefix='.tmp-')
+        np.save(os.path.join(tmp_entry, 'symbols.npy'), np.asarray(suite.symbols))
+        np.save(os.path.join(tmp_entry, 'offsets.npy'), np.asarray(suite.offsets))
+        with open(os.path.join(tmp_entry, 'alphabet.json'), 'w', encoding='utf-8') as f:
+            json.dump(suite.alphabet.symbols, f)
+
+        try:
+            os.rename(tmp_entry, self._entry(key))
+        except OSError:
+            # entry was stored concurrently by another process
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+        self.evict(keep=key)
+        return self.get(key)
+
+    def evict(self, keep=None):
+        entries = []
+        for key in os.listdir(self.directory):
+            entry = self._entry(key)
+            if key.startswith('.tmp-'):
+                # temporary directories older than an hour were left behind by interrupted writes
+                if time.time() - os.path.getmtime(entry) > 3600:
+                    shutil.rmtree(entry, ignore_errors=True)
+                continue
+            if not os.path.isdir(entry):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), size, key))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total_size -= size
@@ -0,0 +1,24 @@
+import os
+from itertools import combinations
+
+import pytest
+
+from data_classes import load_dot_files
+from model_analysis import ModelAnalysis
+
+
+@pytest.mark.parametrize('benchmark', ['BLE', 'MQTT'])
+def test_characterization_set_distinguishes_all_states(benchmark, monkeypatch):
+    # models are loaded relative to the repository root
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    models = load_dot_files(benchmark)
+    assert models
+    for model_name, model in models:
+        analysis = ModelAnalysis(model)
+        char_set = analysis.characterization_set()
+        states = model.states
+        for s_1, s_2 in combinations(range(len(states)), 2):
+            sequence = analysis.distinguishing_sequence(s_1, s_2)
+            assert model.compute_output_seq(states[s_1], sequence) != model.compute_output_seq(states[s_2], sequence)
+            assert any(model.compute_output_seq(states[s_1], suffix) != model.compute_output_seq(states[s_2], suffix)
+                       for suffix in char_set), (model_name, s_1, s_2)
@@ -0,0 +1,59 @@
+import copy
+import os
+import random
+
+import pytest
+from aalpy.learning_algs import run_RPNI
+
+from data_classes import load_dot_files
+from data_generation import generate_random_data
+from experiment_runner import task_seed
+from learning_setups import _random_conformance
+from model_comparison import SequentialConformance, check_equivalence, compare_learned_models, create_test_cases
+
+
+@pytest.fixture
+def learned_models(monkeypatch):
+    # models are loaded relative to the repository root
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    (model_name, model), = load_dot_files('BLE', ['CC2650'])
+    random.seed(task_seed(0, 'model comparison test', model_name))
+    # too little data to learn the model correctly
+    learned_model = run_RPNI(generate_random_data(model, 20, 1, model.size).data, 'mealy', 'sink_state',
+                             print_info=False)
+    test_cases = create_test_cases([(model_name, model)], 500, 'random', seed=0)[model_name]
+    return model, learned_model, test_cases
+
+
+def test_sequential_conformance_on_the_whole_suite_is_exhaustive(learned_models):
+    model, learned_model, test_cases = learned_models
+    conformance, bound, used = _random_conformance(model, learned_model, test_cases, None)
+    assert conformance < 100
+
+    sequential_conformance, sequential_bound, sequential_used = \
+        _random_conformance(model, learned_model, test_cases, SequentialConformance(max_half_width=0))
+    assert sequential_conformance == pytest.approx(conformance)
+    assert sequential_bound == bound == 0
+    assert sequential_used == used == len(test_cases)
+
+
+def test_vectorized_and_scalar_comparison_agree(learned_models):
+    model, learned_model, test_cases = learned_models
+    ratio, divergence = compare_learned_models(model, learned_model, test_cases, return_divergence=True)
+    scalar_ratio, scalar_divergence = compare_learned_models(model, learned_model, test_cases, vectorized=False,
+                                                             return_divergence=True)
+    assert 0 < ratio == scalar_ratio
+    assert list(divergence) == scalar_divergence
+
+
+def test_check_equivalence(learned_models):
+    model, learned_model, _ = learned_models
+    assert check_equivalence(model, model) == (True, None)
+    assert check_equivalence(model, copy.deepcopy(model)) == (True, None)
+
+    equivalent, counterexample = check_equivalence(model, learned_model)
+    assert not equivalent
+    outputs = model.compute_output_seq(model.initial_state, counterexample)
+    learned_outputs = learned_model.compute_output_seq(learned_model.initial_state, counterexample)
+    # the search stops at the first differing output, so the outputs only differ on the last input
+    assert outputs[:-1] == learned_outputs[:-1] and outputs[-1] != learned_outputs[-1]
@@ -0,0 +1,38 @@
+import pytest
+
+from prefix_trie import PrefixTrie, SampleView, max_sibling_list_len
+
+
+def test_traces_are_stored_once_per_prefix():
+    trie = PrefixTrie()
+    node = trie.insert_trace('abc', 'xyz')
+    assert trie.insert_trace('ab', 'xy') == trie.child(trie.child(0, 'a'), 'b')
+    assert trie.insert_trace('abd', 'xyw') != node
+    assert len(trie) == 5
+
+    assert trie.prefix(node) == ('a', 'b', 'c')
+    assert trie.output(node) == 'z'
+    assert trie.depth(node) == 3
+    assert trie.child(node, 'a') is None
+    assert trie.prefix_closed_data() == [(('a',), 'x'), (('a', 'b'), 'y'), (('a', 'b', 'c'), 'z'),
+                                         (('a', 'b', 'd'), 'w')]
+    assert trie.leaf_data() == [(('a', 'b', 'c'), 'z'), (('a', 'b', 'd'), 'w')]
+
+    with pytest.raises(ValueError):
+        trie.insert_trace('ab', 'xx')
+
+
+def test_large_fan_out_and_sealing():
+    trie = PrefixTrie()
+    inputs = [f'i{k}' for k in range(3 * max_sibling_list_len)]
+    nodes = [trie.insert_trace([i, i], ['o', i]) for i in inputs]
+    trie.seal()
+    # the child index is rebuilt after sealing
+    assert trie.insert_trace([inputs[0], 'j'], ['o', 'p']) == len(trie) - 1
+
+    for i, node in zip(inputs, nodes):
+        assert trie.child(trie.child(0, i), i) == node
+    view = SampleView(trie, nodes)
+    assert list(view) == [((i, i), i) for i in inputs]
+    assert view[1] == list(view)[1]
+    assert list(view[2:4]) == list(view)[2:4]
@@ -0,0 +1,49 @@
+import os
+
+from data_classes import load_dot_files
+from experiment_runner import ExperimentRunner
+from model_comparison import create_test_cases
+from results_store import ResultsStore, record_phases
+
+
+def _run(store, models):
+    test_cases_coverage = create_test_cases(models, 100, 'coverage', seed=0)
+    test_cases_random = create_test_cases(models, 100, 'random', seed=0)
+    ExperimentRunner(models, test_cases_coverage, test_cases_random, repeats=2, seed=1, store=store,
+                     rpni_engine='flat').run()
+
+
+def _records(store):
+    records = dict()
+    for record_type in record_phases:
+        for row in store.rows(record_type):
+            # measured times differ between runs
+            key = record_type, row.pop('model'), row.pop('experiment'), row.pop('repeat')
+            assert key not in records
+            records[key] = {column: value for column, value in row.items() if 'measured_time' not in column}
+    return records
+
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path, monkeypatch):
+    # models are loaded relative to the repository root
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    models = load_dot_files('BLE', ['CC2650'])
+
+    store = ResultsStore(str(tmp_path), 'uninterrupted')
+    store.start({'seed': 1})
+    _run(store, models)
+
+    resumed_store = ResultsStore(str(tmp_path), 'resumed')
+    resumed_store.start({'seed': 1})
+    _run(resumed_store, models)
+    # interrupt the run after the L* units and one passive unit, while the next checkpoint record is written
+    with open(resumed_store.checkpoint.path, encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(resumed_store.checkpoint.path, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:4])
+        f.write(lines[4][:10])
+
+    _run(resumed_store, models)
+    # two repetitions of L*, three RPNI experiments and cached L*, and the RPNI experiment on the characterization set
+    assert len(_records(store)) == 2 * 5 + 1
+    assert _records(resumed_store) == _records(store)
@@ -0,0 +1,26 @@
+import os
+import random
+
+import pytest
+from aalpy.learning_algs import run_RPNI
+
+from data_classes import load_dot_files
+from data_generation import generate_nested_random_data
+from experiment_runner import task_seed
+from flat_rpni import run_flat_rpni
+from incremental_rpni import IncrementalRPNI
+from model_cache import compact_model
+
+
+@pytest.mark.parametrize('model_name', ['CC2650', 'nRF52832'])
+def test_rpni_engines_learn_the_same_model(model_name, monkeypatch):
+    # models are loaded relative to the repository root
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    (_, model), = load_dot_files('BLE', [model_name])
+    random.seed(task_seed(0, 'rpni engines test', model_name))
+
+    learner = IncrementalRPNI(print_info=False)
+    for data in generate_nested_random_data(model, [150, 300], 1, 2 * model.size):
+        aalpy_model = compact_model(run_RPNI(data.data, 'mealy', 'sink_state', print_info=False))
+        assert compact_model(run_flat_rpni(data.view(), 'sink_state')) == aalpy_model
+        assert compact_model(learner.update(data.view(), input_completeness='sink_state')) == aalpy_model
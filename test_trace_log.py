@@ -0,0 +1,36 @@
+import pytest
+
+from trace_log import load_trace_log, read_traces, write_traces
+
+traces = [(['connect', 'publish'], ['ack', 'ok']),
+          (['connect'], ['ack']),
+          (['ping', 'connect', 'close'], ['pong', 'ack', 'bye'])]
+
+
+@pytest.mark.parametrize('log_name', ['sessions.jsonl', 'sessions.log'])
+def test_trace_logs_are_read_as_written(log_name, tmp_path):
+    path = str(tmp_path / log_name)
+    write_traces(path, traces)
+    assert list(read_traces(path)) == traces
+
+    data = load_trace_log(path)
+    assert data.size == 3
+    assert data.steps == 6
+    assert data.sequences == [tuple(inputs) for inputs, _ in traces]
+    assert data.data == [(('connect',), 'ack'), (('connect', 'publish'), 'ok'), (('ping',), 'pong'),
+                         (('ping', 'connect'), 'ack'), (('ping', 'connect', 'close'), 'bye')]
+
+
+def test_malformed_trace_logs_are_rejected(tmp_path):
+    path = str(tmp_path / 'sessions.log')
+    write_traces(path, traces)
+    with open(path, 'rb+') as f:
+        f.truncate(len(f.read()) - 1)
+    with pytest.raises(ValueError):
+        list(read_traces(path))
+
+    path = str(tmp_path / 'sessions.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"inputs": ["connect"], "outputs": []}\n')
+    with pytest.raises(ValueError):
+        list(read_traces(path))
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+from array import array
+
+from aalpy.utils import load_automaton_from_file, save_automaton_to_file
+
+from compiled_automata import CompiledMealySUL
+from data_generation import CompactDataSet
+from incremental_rpni import IncrementalRPNI
+from learning_setups import rpni_experiment
+from model_comparison import create_test_cases
+from prefix_trie import PrefixTrie
+
+# Binary trace logs start with binary_magic, followed by records that start with their type:
+#   symbol: type 0, kind (0 input, 1 output), length (uint16) and the UTF-8 encoded symbol. Symbols of a kind are
+#           numbered in the order of their definition, every symbol is defined before its first use.
+#   trace:  type 1, number of steps (uint32) and an input and output id (uint16) per step.
+# All integers are little-endian.
+binary_magic = b'TRACELOG1\n'
+_symbol_record = 0
+_trace_record = 1
+
+
+def _read_exactly(f, size):
+    content = f.read(size)
+    if len(content) != size:
+        raise ValueError(f'Truncated trace log {f.name}.')
+    return content
+
+
+def _read_binary_traces(f):
+    symbols = ([], [])
+    while True:
+        record_type = f.read(1)
+        if not record_type:
+            return
+        if record_type[0] == _symbol_record:
+            kind, length = struct.unpack('<BH', _read_exactly(f, 3))
+            symbols[kind].append(_read_exactly(f, length).decode('utf-8'))
+        elif record_type[0] == _trace_record:
+            steps, = struct.unpack('<I', _read_exactly(f, 4))
+            ids = array('H')
+            ids.frombytes(_read_exactly(f, 4 * steps))
+            if sys.byteorder == 'big':
+                ids.byteswap()
+            inputs, outputs = symbols
+            yield [inputs[i] for i in ids[0::2]], [outputs[o] for o in ids[1::2]]
+        else:
+            raise ValueError(f'Unknown record type {record_type[0]} in trace log {f.name}.')
+
+
+def _read_jsonl_traces(f):
+    for line_number, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        trace = json.loads(line)
+        if len(trace['inputs']) != len(trace['outputs']):
+            raise ValueError(f'Line {line_number} of {f.name}: number of inputs and outputs differ.')
+        yield trace['inputs'], trace['outputs']
+
+
+def read_traces(path):
+    """
+    Lazily reads the (inputs, outputs) traces of a trace log, either a binary log (see binary_magic) or a JSON-lines
+    file with one {"inputs": [...], "outputs": [...]} object per line.
+    """
+    with open(path, 'rb') as f:
+        is_binary = f.read(len(binary_magic)) == binary_magic
+        if is_binary:
+            yield from _read_binary_traces(f)
+            return
+
+    with open(path, encoding='utf-8') as f:
+        yield from _read_jsonl_traces(f)
+
+
+def write_traces(path, traces, binary=None):
+    """
+    Writes (inputs, outputs) traces to a trace log. Unless binary is given, logs ending with .jsonl are written as
+    JSON lines and all others in the binary format, whose symbols have to be strings.
+    """
+    binary = not path.endswith('.jsonl') if binary is None else binary
+    if not binary:
+        with open(path, 'w', encoding='utf-8') as f:
+            for inputs, outputs in traces:
+                f.write(json.dumps({'inputs': list(inputs), 'outputs': list(outputs)}) + '\n')
+        return
+
+    symbol_ids = (dict(), dict())
+    with open(path, 'wb') as f:
+        f.write(binary_magic)
+        for inputs, outputs in traces:
+            ids = array('H')
+            for i, o in zip(inputs, outputs):
+                for kind, symbol in enumerate((i, o)):
+                    symbol_id = symbol_ids[kind].get(symbol)
+                    if symbol_id is None:
+                        symbol_id = symbol_ids[kind][symbol] = len(symbol_ids[kind])
+                        encoded = symbol.encode('utf-8')
+                        f.write(struct.pack('<BBH', _symbol_record, kind, len(encoded)) + encoded)
+                    ids.append(symbol_id)
+            if sys.byteorder == 'big':
+                ids.byteswap()
+            f.write(struct.pack('<BI', _trace_record, len(ids) // 2) + ids.tobytes())
+
+
+def model_traces(model, num_traces, min_trace_len, max_trace_len):
+    """
+    Yields random traces of a model, e.g. to create trace logs for experiments.
+    """
+    input_alphabet = model.get_input_alphabet()
+    sul = CompiledMealySUL(model)
+    for _ in range(num_traces):
+        inputs = random.choices(input_alphabet, k=random.randint(min_trace_len, max_trace_len))
+        yield inputs, sul.query(inputs)
+
+
+def load_trace_log(path):
+    """
+    Streams the traces of a trace log into a PrefixTrie.
+
+    Returns:
+
+        prefix-closed CompactDataSet of the log, where every trace is a sampled sequence
+
+    """
+    trie = PrefixTrie()
+    sequence_nodes = array('l')
+    steps = 0
+    for inputs, outputs in read_traces(path):
+        sequence_nodes.append(trie.insert_trace(inputs, outputs))
+        steps += len(inputs)
+    if not sequence_nodes:
+        raise ValueError(f'Trace log {path} contains no traces.')
+
+    trie.seal()
+    return CompactDataSet(trie, len(sequence_nodes), steps, sequence_nodes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Passive learning from trace logs.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    learn_parser = subparsers.add_parser('learn', help='learn a Mealy machine with RPNI from a trace log')
+    learn_parser.add_argument('log')
+    learn_parser.add_argument('--model', default=None, help='reference .dot model the learned model is evaluated on')
+    learn_parser.add_argument('--num-tests', type=int, default=1000, help='number of conformance test cases')
+    learn_parser.add_argument('--seed', type=int, default=0)
+    learn_parser.add_argument('--output', default=None,
+                              help='.dot file of the learned model (default: <log>.learned.dot next to the log)')
+
+    generate_parser = subparsers.add_parser('generate', help='write random traces of a .dot model to a trace log')
+    generate_parser.add_argument('model')
+    generate_parser.add_argument('log', help='output log; .jsonl for JSON lines, binary otherwise')
+    generate_parser.add_argument('--num-traces', type=int, default=1000)
+    generate_parser.add_argument('--min-len', type=int, default=1)
+    generate_parser.add_argument('--max-len', type=int, default=20)
+    generate_parser.add_argument('--seed', type=int, default=0)
+
+    convert_parser = subparsers.add_parser('convert', help='convert a trace log to the format of the output log')
+    convert_parser.add_argument('log')
+    convert_parser.add_argument('output')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        random.seed(args.seed)
+        write_traces(args.log, model_traces(load_automaton_from_file(args.model, 'mealy'), args.num_traces,
+                                            args.min_len, args.max_len))
+        return 0
+
+    if args.command == 'convert':
+        write_traces(args.output, read_traces(args.log))
+        return 0
+
+    data = load_trace_log(args.log)
+    print(f'Traces: {data.size}')
+    print(f'Average trace length: {data.average_len()}')
+    print(f'PTA nodes: {len(data.trie)}')
+
+    learner = IncrementalRPNI()
+    rpni_model = learner.update(data.view(), input_completeness='sink_state')
+    output = args.output if args.output is not None else f'{os.path.splitext(args.log)[0]}.learned.dot'
+    save_automaton_to_file(rpni_model, os.path.splitext(output)[0])
+
+    if args.model is None:
+        print(f'States: {rpni_model.size}')
+        return 0
+
+    model = load_automaton_from_file(args.model, 'mealy')
+    missing_inputs = set(model.get_input_alphabet()) - set(data.trie.input_symbols.symbols)
+    if missing_inputs:
+        print(f'Inputs {sorted(missing_inputs)} of the reference model do not occur in the trace log, '
+              f'conformance cannot be evaluated.')
+        return 1
+
+    model_name = os.path.basename(args.model)
+    test_cases_coverage = create_test_cases([(model_name, model)], args.num_tests, 'coverage', seed=args.seed)
+    test_cases_random = create_test_cases([(model_name, model)], args.num_tests, 'random', seed=args.seed)
+    # the learner replays its decisions on the same data instead of learning again
+    experiment = rpni_experiment(data, model, test_cases_coverage[model_name], test_cases_random[model_name],
+                                 learner=learner)
+
+    print(f'States: {experiment.model_size}')
+    print(f'Conformance (coverage): {experiment.conformance_coverage}')
+    print(f'Conformance (random): {experiment.conformance_random}')
+    print(f'Correctly learned model: {experiment.correctly_learned_model}')
+    if experiment.counterexample is not None:
+        print(f'Shortest counterexample: {experiment.counterexample}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())